@@ -1,21 +1,28 @@
 import asyncio
-import base64
 import cv2
 import time
 import os
+import sys
 import json
 import numpy as np
-from threading import Thread, Lock
-from queue import Queue
-from typing import Optional, Dict, List
+from threading import Event, Thread, Lock
+from typing import Optional, Dict, List, Set
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from ultralytics import YOLO
-import pytesseract
 
 import config
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pipeline import LatestSlot, PipelineStage
+from camera import FrameGrabber
+from inference import Detector, load_detector
+from scheduler import AdaptiveDetector
+from tracker import IoUTracker
+from protocol import PROTOCOL_BINARY, negotiate_protocol
+from broadcast import EncodedFrame, FrameBroadcaster
+from ocr_pool import BrokenProcessPool, OCRWorkerPool, crop_bbox
+
 
 app = FastAPI()
 
@@ -31,19 +38,21 @@ app.add_middleware(
 
 class AppState:
     def __init__(self):
-        self.model: Optional[YOLO] = None
+        self.model: Optional[Detector] = None
         self.labels: Dict[int, str] = {}
 
         self.current_mode = "SCAN"
         self.active_object: Optional[str] = None
-        self.active_bbox: Optional[List[int]] = None
+        self.active_track: Optional[int] = None
 
-        self.frame_queue = Queue(maxsize=5)
-        self.running = False
+        self.broadcaster = FrameBroadcaster(config.SLOW_CLIENT_DROP_LIMIT)
+        self.ocr_pool: Optional[OCRWorkerPool] = None
+        self.processor: Optional["VideoProcessor"] = None
+        self.processor_lock = Lock()  # serialises starting and stopping the processor
         self.lock = Lock()
 
+        self.tracker = IoUTracker()
         self.spoken_objects = set()
-        self.detection_start_time = {}
         self.last_guidance_time = {}
 
         self.connected_clients = 0
@@ -58,124 +67,179 @@ state = AppState()
 #VIDEO PROCESSOR
 
 class VideoProcessor(Thread):
+    """
+    Owns the camera and runs capture -> inference -> encode as separate
+    stages joined by latest-frame-wins slots, so a slow stage drops stale
+    frames instead of queueing them up. Each processor stops on its own
+    event, so one that is still shutting down cannot stop its successor.
+    """
+
     def __init__(self, state: AppState):
         super().__init__(daemon=True)
         self.state = state
-        self.cap = None
+        self.cap: Optional[FrameGrabber] = None
+        self.stages: List[PipelineStage] = []
+        self.stopped = Event()
+
+    def is_running(self) -> bool:
+        return not self.stopped.is_set()
+
+    def stop(self):
+        self.stopped.set()
+
+    def capture(self):
+        frame, captured_at, _ = self.cap.read_stamped(timeout=0.5)
+        if frame is None:
+            if not self.cap.isOpened():
+                print("Camera stopped delivering frames")
+                self.stop()
+            return None
+        return {"frame": frame, "captured_at": captured_at}
+
+    def infer(self, item):
+        frame = item["frame"]
+        records = self.state.model.detect(frame).records(self.state.conf_thresh)
+        labels = self.state.labels
+
+        with self.state.lock:
+            self.state.tracker.update(records, item["captured_at"])
+            # announcements are keyed by track, forget the ones that ended
+            self.state.spoken_objects.intersection_update(self.state.tracker.tracks)
+
+        detection_data = [{
+            "class": labels[class_id],
+            "confidence": conf,
+            "bbox": bbox,
+            "class_id": class_id,
+            "track_id": track_id
+        } for bbox, conf, class_id, track_id in zip(
+            records["bbox"].tolist(), records["conf"].tolist(),
+            records["class_id"].tolist(), records["track_id"].tolist()
+        )]
+
+        item["records"] = records
+        item["detections"] = detection_data
+        return item
+
+    def encode(self, item):
+        success, buffer = cv2.imencode(
+            ".jpg", item["frame"],
+            [cv2.IMWRITE_JPEG_QUALITY, config.JPEG_QUALITY]
+        )
+        if not success:
+            print("Failed to encode frame!")
+            return None
+
+        frame = EncodedFrame(
+            buffer.tobytes(), item["records"], item["detections"],
+            item["frame"], item["captured_at"]
+        )
+        self.state.broadcaster.publish(frame)
+        return frame
+
+    def stats(self):
+        return [stage.snapshot() for stage in self.stages]
 
     def run(self):
         print("Starting video processor...")
 
         try:
-            self.cap = cv2.VideoCapture(
-                self.state.camera_index,
-                cv2.CAP_AVFOUNDATION
-            )
-
-            if not self.cap.isOpened():
-                print("ERROR: Cannot open camera")
-                self.state.running = False
+            source = config.REPLAY_SOURCE or self.state.camera_index
+            try:
+                self.cap = FrameGrabber(
+                    source, config.CAMERA_BACKEND,
+                    config.FRAME_WIDTH, config.FRAME_HEIGHT,
+                    config.CAMERA_BUFFER_SIZE,
+                    realtime=config.REPLAY_REALTIME, loop=True,
+                    fps=config.REPLAY_FPS or None
+                ).start()
+            except IOError as e:
+                print("ERROR: Cannot open camera:", e)
+                self.stop()
                 return
 
-            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, config.FRAME_WIDTH)
-            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, config.FRAME_HEIGHT)
-
             print("Camera opened successfully")
-
-            while self.state.running:
-                ret, frame = self.cap.read()
-                if not ret or frame is None:
-                    print("Failed to read frame from camera!")
-                    time.sleep(0.1)
-                    continue
-                else:
-                    print(f"Got frame with shape: {frame.shape}")
-
-                results = self.state.model(frame, verbose=False)
-                detections = results[0].boxes
-
-                detection_data = []
-                current_objects = set()
-
-                for det in detections:
-                    conf = det.conf.item()
-                    if conf < self.state.conf_thresh:
-                        continue
-
-                    bbox = det.xyxy.cpu().numpy().squeeze().astype(int)
-                    bbox = [int(x) for x in bbox]
-
-                    class_id = int(det.cls.item())
-                    classname = self.state.labels[class_id]
-
-                    detection_data.append({
-                        "class": classname,
-                        "confidence": float(conf),
-                        "bbox": bbox,
-                        "class_id": class_id
-                    })
-
-                    current_objects.add(classname)
-
-
-                now = time.time()
-                with self.state.lock:
-                    for obj in current_objects:
-                        self.state.detection_start_time.setdefault(obj, now)
-
-                    for obj in list(self.state.detection_start_time):
-                        if obj not in current_objects:
-                            self.state.detection_start_time.pop(obj)
-                            self.state.spoken_objects.discard(obj)
-
-                success, buffer = cv2.imencode(
-                    ".jpg", frame,
-                    [cv2.IMWRITE_JPEG_QUALITY, config.JPEG_QUALITY]
-                )
-                if not success:
-                    print("Failed to encode frame!")
-                    time.sleep(0.1)
-                    continue
-
-                encoded_frame = base64.b64encode(buffer).decode()
-                print(f"Encoded frame size: {len(encoded_frame)} characters")
-
-
-                payload = {
-                    "frame": base64.b64encode(buffer).decode(),
-                    "detections": detection_data,
-                    "raw_frame": frame
-                }
-
-                if self.state.frame_queue.full():
-                    self.state.frame_queue.get_nowait()
-
-                self.state.frame_queue.put(payload)
-                print("Frame base64 preview:", payload["frame"][:50])
-
-                time.sleep(0.03)
+            self.state.model.reset()
+            with self.state.lock:
+                self.state.tracker.reset()
+
+            captured = LatestSlot()
+            inferred = LatestSlot()
+            self.stages = [
+                PipelineStage("capture", self.capture, self.is_running, outbox=captured),
+                PipelineStage("inference", self.infer, self.is_running, inbox=captured, outbox=inferred),
+                PipelineStage("encode", self.encode, self.is_running, inbox=inferred),
+            ]
+            for stage in self.stages:
+                stage.start()
+
+            last_report = time.time()
+            while all(s.is_alive() for s in self.stages) and not self.stopped.wait(0.5):
+                if time.time() - last_report >= config.STATS_INTERVAL:
+                    last_report = time.time()
+                    for s in self.stats():
+                        print(f"[{s['stage']}] {s['fps']:.1f} fps | "
+                              f"wait {s['queue_wait_ms']:.1f} ms | "
+                              f"busy {s['busy_ms']:.1f} ms | dropped {s['dropped']}")
+                    s = self.state.model.stats()
+                    print(f"[scheduler] YOLO every {s['interval']} frames | "
+                          f"detect {s['detect_ms']:.1f} ms | track {s['track_ms']:.1f} ms")
 
         except Exception as e:
             print("Video processor error:", e)
         finally:
+            self.stop()
+            for stage in self.stages:
+                if stage.inbox is not None:
+                    stage.inbox.close()
+                stage.join(timeout=2.0)
             if self.cap:
                 self.cap.release()
-            self.state.running = False
             print("Video processor stopped")
 
 
-def do_ocr_on_bbox(frame, bbox):
-    x1, y1, x2, y2 = bbox
-    crop = frame[y1:y2, x1:x2]
-
-    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
-    gray = cv2.equalizeHist(gray)
+def ensure_processor():
+    """
+    Starts a VideoProcessor unless one is running. A processor that is
+    still shutting down is joined first so it releases the camera.
+    Blocks while joining, so call it off the event loop.
+    """
+    with state.processor_lock:
+        previous = state.processor
+        if previous is not None and previous.is_running():
+            return
+        if previous is not None:
+            previous.stop()
+            previous.join()
+        state.processor = VideoProcessor(state)
+        state.processor.start()
+
+def stop_processor():
+    processor = state.processor
+    if processor is not None:
+        processor.stop()
 
-    return pytesseract.image_to_string(gray, config="--psm 6").strip()
 
 # COMMANDS
 
-async def handle_command(cmd: str, ws: WebSocket):
+async def send_ocr_result(ws: WebSocket, job):
+    try:
+        text = await job
+    except asyncio.CancelledError:
+        return
+    except BrokenProcessPool as e:
+        print("OCR worker failed:", e)
+        text = "Text reading failed, please try again"
+    except Exception as e:
+        print("OCR error:", e)
+        text = ""
+    try:
+        await ws.send_json({"type": "tts", "text": text or "No text found"})
+    except (WebSocketDisconnect, RuntimeError):
+        # the client left while OCR was running
+        pass
+
+async def handle_command(cmd: str, ws: WebSocket, client_id: int, ocr_tasks: Set[asyncio.Task]):
     if cmd == "SCAN":
         state.current_mode = "SCAN"
         await ws.send_json({"type": "tts", "text": "Scan mode"})
@@ -185,85 +249,150 @@ async def handle_command(cmd: str, ws: WebSocket):
         await ws.send_json({"type": "tts", "text": "Guide mode"})
 
     elif cmd == "SELECT":
-        if not state.frame_queue.empty():
-            frame = list(state.frame_queue.queue)[-1]
-            if frame["detections"]:
-                obj = max(
-                    frame["detections"],
-                    key=lambda d: (d["bbox"][2]-d["bbox"][0]) *
-                                  (d["bbox"][3]-d["bbox"][1])
-                )
+        frame = state.broadcaster.latest
+        if frame is not None:
+            if frame.detections:
+                obj = frame.detections[int(frame.records["area"].argmax())]
                 state.active_object = obj["class"]
-                state.active_bbox = obj["bbox"]
+                state.active_track = obj["track_id"]
                 await ws.send_json({"type": "tts", "text": f"{obj['class']} selected"})
 
     elif cmd == "READ":
-        if state.active_bbox and not state.frame_queue.empty():
-            frame = list(state.frame_queue.queue)[-1]
-            text = do_ocr_on_bbox(frame["raw_frame"], state.active_bbox)
-            await ws.send_json({"type": "tts", "text": text or "No text found"})
+        frame = state.broadcaster.latest
+        if state.active_track is not None and frame is not None:
+            with state.lock:
+                track = state.tracker.visible(state.active_track)
+                bbox = track.bbox if track is not None else None
+            crop = crop_bbox(frame.raw_frame, bbox) if bbox is not None else None
+            if crop is None:
+                await ws.send_json({"type": "tts", "text": "Object not visible"})
+                return
+
+            try:
+                job = state.ocr_pool.submit(client_id, crop)
+            except BrokenProcessPool as e:
+                print("OCR worker pool unavailable:", e)
+                await ws.send_json({"type": "tts", "text": "Text reading is unavailable"})
+                return
+            if job is None:
+                await ws.send_json({"type": "tts", "text": "Still reading, please wait"})
+                return
+            # the result is sent when ready, streaming carries on meanwhile
+            task = asyncio.create_task(send_ocr_result(ws, job))
+            ocr_tasks.add(task)
+            task.add_done_callback(ocr_tasks.discard)
 
 #WEBSOCKET
 
+async def send_frames(ws: WebSocket, subscriber):
+    while True:
+        frame = await subscriber.take()
+        if frame is None:
+            return
+        message = frame.message(subscriber.protocol, state.current_mode)
+        if subscriber.protocol == PROTOCOL_BINARY:
+            await ws.send_bytes(message)
+        else:
+            await ws.send_text(message)
+        subscriber.record_sent(frame, time.time())
+
+async def receive_commands(ws: WebSocket, client_id: int, ocr_tasks: Set[asyncio.Task]):
+    while True:
+        msg = await ws.receive_json()
+        if msg.get("type") == "command":
+            await handle_command(msg["command"], ws, client_id, ocr_tasks)
+
 @app.websocket("/ws")
 async def ws_endpoint(ws: WebSocket):
     await ws.accept()
+    protocol = negotiate_protocol(ws.query_params.get("protocol", ""))
+    if protocol == PROTOCOL_BINARY:
+        await ws.send_json({
+            "type": "hello",
+            "protocol": protocol,
+            "labels": {int(k): v for k, v in state.labels.items()}
+        })
+
+    subscriber = state.broadcaster.subscribe(protocol)
 
     with state.lock:
         state.connected_clients += 1
-        if not state.running:
-            state.running = True
-            VideoProcessor(state).start()
+    await asyncio.to_thread(ensure_processor)
 
+    ocr_tasks: Set[asyncio.Task] = set()
+    sender = asyncio.create_task(send_frames(ws, subscriber))
+    receiver = asyncio.create_task(receive_commands(ws, subscriber.client_id, ocr_tasks))
     try:
-        while True:
-            if not state.frame_queue.empty():
-                frame = state.frame_queue.get()
-                await ws.send_json({
-                    "type": "frame",
-                    "image": frame["frame"],
-                    "detections": frame["detections"],
-                    "mode": state.current_mode
-                })
-
-            try:
-                msg = await asyncio.wait_for(ws.receive_json(), timeout=0.01)
-                if msg.get("type") == "command":
-                    await handle_command(msg["command"], ws)
-            except asyncio.TimeoutError:
-                pass
-
-            await asyncio.sleep(0.01)
+        done, pending = await asyncio.wait(
+            {sender, receiver}, return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        if subscriber.evicted:
+            await ws.close(code=1013, reason="Client too slow")
+        for task in done:
+            exc = task.exception()
+            if exc and not isinstance(exc, WebSocketDisconnect):
+                print("WebSocket error:", exc)
 
     except WebSocketDisconnect:
         pass
     finally:
+        state.ocr_pool.cancel(subscriber.client_id)
+        for task in ocr_tasks:
+            task.cancel()
+        subscriber.close()
+        state.broadcaster.unsubscribe(subscriber)
         with state.lock:
             state.connected_clients -= 1
             if state.connected_clients == 0:
-                state.running = False
+                stop_processor()
 
 # LIFECYCLE
 
 @app.on_event("startup")
 async def startup():
-    print("Loading YOLO model...")
-    if not os.path.exists(config.MODEL_PATH):
-        raise FileNotFoundError(config.MODEL_PATH)
-
-    state.model = YOLO(config.MODEL_PATH)
+    model_path = config.INT8_MODEL_PATH if config.MODEL_PRECISION == "int8" else config.MODEL_PATH
+    print(f"Loading YOLO model ({config.MODEL_PRECISION})...")
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(model_path)
+
+    state.model = AdaptiveDetector(
+        load_detector(model_path, config.INFERENCE_BACKEND, config.INFERENCE_THREADS),
+        config.TARGET_FPS, config.DETECT_MAX_INTERVAL, config.SCENE_CHANGE_THRESHOLD
+    )
     state.labels = state.model.names
-    print("Model loaded:", list(state.labels.values()))
+    print(f"Model loaded ({state.model.backend}):", list(state.labels.values()))
+
+    state.ocr_pool = OCRWorkerPool(
+        config.OCR_WORKERS, config.OCR_MAX_PENDING, config.OCR_ENGINE, config.OCR_TEXT_LINES
+    )
 
 @app.on_event("shutdown")
 async def shutdown():
     print("Shutting down backend")
-    state.running = False
+    stop_processor()
+    if state.ocr_pool:
+        state.ocr_pool.shutdown()
 
 @app.get("/")
 async def root():
     return {"status": "ok"}
 
+@app.get("/stats")
+async def stats():
+    processor = state.processor
+    if processor is None or not processor.is_running():
+        return {"running": False, "stages": [], "clients": []}
+    return {
+        "running": True,
+        "stages": processor.stats(),
+        "scheduler": state.model.stats(),
+        "clients": state.broadcaster.stats()
+    }
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host=config.HOST, port=config.PORT)
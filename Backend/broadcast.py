@@ -0,0 +1,164 @@
+import asyncio
+import itertools
+import json
+from collections import deque
+from threading import Lock
+from typing import Dict, List, Optional
+
+from protocol import PROTOCOL_BINARY, pack_binary_frame, json_frame
+
+
+class EncodedFrame:
+    """
+    A processed frame shared by every subscriber. The JPEG is encoded once
+    by the pipeline and each wire message (bytes, or JSON text) is built
+    at most once per mode, no matter how many clients receive it.
+    """
+
+    def __init__(self, jpeg: bytes, records, detections: List[Dict], raw_frame, captured_at: float):
+        self.jpeg = jpeg
+        self.records = records
+        self.detections = detections
+        self.raw_frame = raw_frame
+        self.captured_at = captured_at
+        self._messages = {}
+        self._lock = Lock()
+
+    def message(self, protocol: str, mode: str):
+        key = (protocol, mode)
+        with self._lock:
+            if key not in self._messages:
+                if protocol == PROTOCOL_BINARY:
+                    self._messages[key] = pack_binary_frame(
+                        self.jpeg, self.records, mode, self.captured_at
+                    )
+                else:
+                    # serialized here so JSON clients share the text, not just the dict
+                    self._messages[key] = json.dumps(
+                        json_frame(self.jpeg, self.detections, mode, self.captured_at),
+                        separators=(",", ":"), ensure_ascii=False
+                    )
+            return self._messages[key]
+
+
+class Subscriber:
+    """
+    One client's latest-frame slot, owned by the event loop that serves the
+    client. deliver() may be called from any thread; it hands the frame to
+    the loop with call_soon_threadsafe, so a waiting take() wakes up as soon
+    as the frame exists instead of polling for it.
+    """
+
+    def __init__(self, client_id: int, protocol: str, drop_limit: int,
+                 loop: asyncio.AbstractEventLoop):
+        self.client_id = client_id
+        self.protocol = protocol
+        self.drop_limit = drop_limit
+        self.loop = loop
+        self.sent = 0
+        self.dropped = 0
+        self.consecutive_drops = 0
+        self.evicted = False
+        self.closed = False
+        self._frame: Optional[EncodedFrame] = None
+        self._ready = asyncio.Event()
+        self._latencies = deque(maxlen=120)  # capture to socket send, seconds
+
+    def deliver(self, frame: "EncodedFrame") -> bool:
+        try:
+            self.loop.call_soon_threadsafe(self._put, frame)
+            return True
+        except RuntimeError:
+            # event loop already closed
+            return False
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    def _put(self, frame: "EncodedFrame"):
+        if self.closed:
+            return
+        if self._frame is not None:
+            self.dropped += 1
+            self.consecutive_drops += 1
+            if self.consecutive_drops >= self.drop_limit:
+                print(f"Client {self.client_id} stalled, dropping it")
+                self.evicted = True
+                self.close()
+                return
+        self._frame = frame
+        self._ready.set()
+
+    async def take(self) -> Optional["EncodedFrame"]:
+        """Waits for the next frame; returns None once the subscriber is closed."""
+        while self._frame is None and not self.closed:
+            self._ready.clear()
+            await self._ready.wait()
+        if self.closed:
+            return None
+        frame, self._frame = self._frame, None
+        self.sent += 1
+        self.consecutive_drops = 0
+        return frame
+
+    def record_sent(self, frame: "EncodedFrame", sent_at: float):
+        self._latencies.append(sent_at - frame.captured_at)
+
+    def latency_ms(self) -> Dict:
+        latencies = sorted(self._latencies)
+        if not latencies:
+            return {"avg": 0.0, "p95": 0.0}
+        return {
+            "avg": round(sum(latencies) / len(latencies) * 1000, 2),
+            "p95": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 2),
+        }
+
+
+class FrameBroadcaster:
+    """
+    Single-producer fan-out: the encode stage publishes each frame once and
+    every connected client gets it through its own latest-frame slot. A
+    client that falls behind only loses its own stale frames; one that has
+    not taken a frame for `drop_limit` deliveries is evicted as stalled.
+    """
+
+    def __init__(self, drop_limit: int):
+        self.drop_limit = drop_limit
+        self.latest: Optional[EncodedFrame] = None
+        self._subscribers: Dict[int, Subscriber] = {}
+        self._ids = itertools.count(1)
+        self._lock = Lock()
+
+    def subscribe(self, protocol: str) -> Subscriber:
+        # must be called from the event loop that will serve the client
+        sub = Subscriber(next(self._ids), protocol, self.drop_limit,
+                         asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers[sub.client_id] = sub
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            self._subscribers.pop(sub.client_id, None)
+
+    def publish(self, frame: EncodedFrame):
+        self.latest = frame
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+
+        for sub in subscribers:
+            if sub.closed or not sub.deliver(frame):
+                self.unsubscribe(sub)
+
+    def stats(self) -> List[Dict]:
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        return [{
+            "client": sub.client_id,
+            "protocol": sub.protocol,
+            "sent": sub.sent,
+            "dropped": sub.dropped,
+            "consecutive_drops": sub.consecutive_drops,
+            "latency_ms": sub.latency_ms(),
+        } for sub in subscribers]
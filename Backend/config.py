@@ -1,22 +1,40 @@
 # Model Configuration
 MODEL_PATH = "/Users/rasikdhakal/Desktop/Yolo/my_model_v2/my_model_v2.pt" 
 CONFIDENCE_THRESHOLD = 0.5
+INFERENCE_BACKEND = "auto"  # auto, ultralytics, onnx or openvino (auto picks by MODEL_PATH type)
+INFERENCE_THREADS = 0  # CPU threads for onnx/openvino, 0 = runtime default
+MODEL_PRECISION = "fp32"  # fp32 uses MODEL_PATH, int8 uses INT8_MODEL_PATH
+INT8_MODEL_PATH = "/Users/rasikdhakal/Desktop/Yolo/my_model_v2/my_model_v2_int8.onnx"  # built with quantize.py
 
 # Camera Configuration
 CAMERA_INDEX = 0  # 0 for default webcam, 1 for external
+CAMERA_BACKEND = "auto"  # auto, v4l2, ffmpeg, gstreamer, avfoundation, dshow or msmf
+CAMERA_BUFFER_SIZE = 1  # frames the driver may queue; 1 keeps latency lowest
+REPLAY_SOURCE = None  # video file or image folder (e.g. predict_v2) to loop instead of the camera
+REPLAY_REALTIME = True  # pace the replay like a camera; False = as fast as the pipeline takes frames
+REPLAY_FPS = 0  # replay pace, 0 = the file's own FPS (30 for image folders)
 FRAME_WIDTH = 640
 FRAME_HEIGHT = 480
 JPEG_QUALITY = 80  # 0-100, higher = better quality but larger size
+STATS_INTERVAL = 5.0  # seconds between pipeline throughput reports
+TARGET_FPS = 15.0  # inference rate to hold; YOLO is skipped on frames in between (0 = every frame)
+DETECT_MAX_INTERVAL = 8  # run YOLO at least every this many frames
+SCENE_CHANGE_THRESHOLD = 0.06  # frame difference (0-1) that forces a fresh detection
 
 # Detection Configuration
 CONFIRMATION_TIME = 1.0  # seconds - object must be visible this long before announcement
 GUIDANCE_COOLDOWN = 1.5  # seconds between guidance messages
 OCR_MIN_AREA_RATIO = 0.20  # minimum object size for OCR
 OCR_MAX_AREA_RATIO = 0.55  # maximum object size for OCR
+OCR_WORKERS = 2  # worker processes for READ
+OCR_ENGINE = "auto"  # tesserocr (in-process), pytesseract (subprocess) or auto
+OCR_MAX_PENDING = 4  # OCR jobs allowed in flight before READ is refused
+OCR_TEXT_LINES = False  # OCR the detected text lines instead of the whole crop (experimental)
 
 # Server Configuration
 HOST = "0.0.0.0"
 PORT = 8000
+SLOW_CLIENT_DROP_LIMIT = 150  # frames a client may skip in a row before it is disconnected
 CORS_ORIGINS = [
     "http://localhost:3000",  # React default
     "http://localhost:5173",  # Vite default
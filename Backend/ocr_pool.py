@@ -0,0 +1,100 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Set
+
+import cv2
+
+from ocr_engine import get_engine
+from text_regions import read_text
+
+
+def crop_bbox(frame, bbox):
+    h, w = frame.shape[:2]
+    x1, y1, x2, y2 = bbox
+    x1, y1 = max(0, int(x1)), max(0, int(y1))
+    x2, y2 = min(w, int(x2)), min(h, int(y2))
+    if x2 <= x1 or y2 <= y1:
+        return None
+    # copy so only the crop is pickled to the worker process
+    return frame[y1:y2, x1:x2].copy()
+
+
+def init_worker(engine: str):
+    # load the OCR engine once per worker process, not once per job
+    get_engine(engine)
+
+
+def do_ocr_on_crop(engine: str, crop, text_lines: bool = False):
+    # runs inside a worker process
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    read = lambda image: get_engine(engine).read_with_confidence(cv2.equalizeHist(image), psm=6)
+    text, _ = read_text(gray, read) if text_lines else read(gray)
+    return text
+
+
+class OCRWorkerPool:
+    """
+    Runs OCR jobs in worker processes so tesseract never blocks the event
+    loop. At most `max_pending` jobs are in flight; further submissions are
+    refused. Jobs are tracked per client so they can be cancelled when the
+    client disconnects. A pool broken by a dying worker is replaced on the
+    next submission; the jobs it held fail with BrokenProcessPool.
+    """
+
+    def __init__(self, workers: int, max_pending: int, engine: str, text_lines: bool = False):
+        self.workers = workers
+        self.engine = engine
+        self.text_lines = text_lines
+        self.max_pending = max_pending
+        self.executor = self._new_executor()
+        self._jobs: Dict[int, Set[asyncio.Future]] = {}
+
+    def _new_executor(self) -> ProcessPoolExecutor:
+        # spawned, not forked: the pool starts on the first READ, when camera,
+        # pipeline and inference threads may hold locks a forked child inherits
+        return ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker, initargs=(self.engine,)
+        )
+
+    @property
+    def pending(self) -> int:
+        return sum(len(jobs) for jobs in self._jobs.values())
+
+    def submit(self, client_id: int, crop) -> Optional[asyncio.Future]:
+        if self.pending >= self.max_pending:
+            return None
+
+        loop = asyncio.get_running_loop()
+        try:
+            job = loop.run_in_executor(self.executor, do_ocr_on_crop, self.engine, crop, self.text_lines)
+        except BrokenProcessPool:
+            # a worker died (failed initializer, native crash), which breaks
+            # the executor for good; start fresh workers for this job
+            print("OCR worker pool broken, restarting it")
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self._new_executor()
+            job = loop.run_in_executor(self.executor, do_ocr_on_crop, self.engine, crop, self.text_lines)
+        self._jobs.setdefault(client_id, set()).add(job)
+        job.add_done_callback(lambda j: self._discard(client_id, j))
+        return job
+
+    def cancel(self, client_id: int):
+        # queued jobs are dropped; a job already running finishes but is ignored
+        for job in self._jobs.pop(client_id, set()):
+            job.cancel()
+
+    def shutdown(self):
+        for client_id in list(self._jobs):
+            self.cancel(client_id)
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _discard(self, client_id: int, job: asyncio.Future):
+        jobs = self._jobs.get(client_id)
+        if jobs is None:
+            return
+        jobs.discard(job)
+        if not jobs:
+            self._jobs.pop(client_id, None)
@@ -0,0 +1,84 @@
+import base64
+import struct
+from typing import Dict, List
+
+import numpy as np
+
+# Binary frame message, little-endian:
+#   header    magic(4s) version(B) mode(B) detection_count(H) captured_at(d)
+#   detection class_id(H) confidence(f) xmin(H) ymin(H) xmax(H) ymax(H)
+#   remainder raw JPEG bytes
+BINARY_MAGIC = b"ARSF"
+BINARY_VERSION = 1
+HEADER = struct.Struct("<4sBBHd")
+DETECTION = struct.Struct("<HfHHHH")
+# same layout as DETECTION, so a whole frame's records pack in one go
+DETECTION_WIRE_DTYPE = np.dtype([
+    ("class_id", "<u2"),
+    ("conf", "<f4"),
+    ("bbox", "<u2", (4,)),
+])
+
+PROTOCOL_JSON = "json"
+PROTOCOL_BINARY = "binary"
+
+MODE_CODES = {"SCAN": 0, "GUIDE": 1}
+
+
+def negotiate_protocol(requested: str) -> str:
+    # clients opt in with /ws?protocol=binary, everyone else keeps base64 JSON
+    if requested and requested.lower() == PROTOCOL_BINARY:
+        return PROTOCOL_BINARY
+    return PROTOCOL_JSON
+
+
+def pack_binary_frame(jpeg: bytes, records, mode: str, captured_at: float) -> bytes:
+    """Packs a frame from its DETECTION_DTYPE records (see inference.py)."""
+    wire = np.empty(len(records), dtype=DETECTION_WIRE_DTYPE)
+    wire["class_id"] = records["class_id"]
+    wire["conf"] = records["conf"]
+    wire["bbox"] = np.clip(records["bbox"], 0, 0xFFFF)
+
+    header = HEADER.pack(
+        BINARY_MAGIC,
+        BINARY_VERSION,
+        MODE_CODES.get(mode, 0),
+        len(records),
+        captured_at,
+    )
+    return b"".join((header, wire.tobytes(), jpeg))
+
+
+def unpack_binary_frame(message: bytes) -> Dict:
+    magic, version, mode_code, count, captured_at = HEADER.unpack_from(message, 0)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError("Not a binary frame message")
+
+    modes = {code: name for name, code in MODE_CODES.items()}
+    detections = []
+    offset = HEADER.size
+    for _ in range(count):
+        class_id, conf, xmin, ymin, xmax, ymax = DETECTION.unpack_from(message, offset)
+        detections.append({
+            "class_id": class_id,
+            "confidence": conf,
+            "bbox": [xmin, ymin, xmax, ymax],
+        })
+        offset += DETECTION.size
+
+    return {
+        "mode": modes.get(mode_code, "SCAN"),
+        "captured_at": captured_at,
+        "detections": detections,
+        "jpeg": bytes(message[offset:]),
+    }
+
+
+def json_frame(jpeg: bytes, detections: List[Dict], mode: str, captured_at: float) -> Dict:
+    return {
+        "type": "frame",
+        "image": base64.b64encode(jpeg).decode(),
+        "detections": detections,
+        "mode": mode,
+        "captured_at": captured_at
+    }
@@ -1,179 +1,283 @@
+import os
+import re
 import sqlite3
+import threading
 from datetime import datetime
 
 import tkinter as tk
 from tkinter import messagebox
 import customtkinter as ctk
 
+from db_connections import get_pool
+from medicine_index import MedicineIndex
+from schedule_index import ScheduleIndex
+
+# one fuzzy index per database file, shared by every MedicineDatabase on it
+# so edits made from the database manager window are seen by verify
+_medicine_indexes = {}
+_medicine_indexes_lock = threading.Lock()
+
+# likewise for intake times; dropped on every schedule change and rebuilt on next use
+_schedule_indexes = {}
+_schedule_indexes_lock = threading.Lock()
+
 
 class MedicineDatabase:
     def __init__(self, db_name="medicine_db.sqlite"):
         self.db_name = db_name
+        self.fts_enabled = False
+        self.pool = get_pool(db_name)
         self.init_database()
     
     def init_database(self):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS medicines (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                medicine_name TEXT NOT NULL,
-                dosage TEXT,
-                form TEXT,
-                frequency TEXT,
-                notes TEXT,
-                active_ingredients TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute(''' 
-            CREATE TABLE IF NOT EXISTS intake_schedule (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                medicine_id INTEGER NOT NULL,
-                time_of_day TEXT NOT NULL,
-                with_food TEXT,
-                special_instructions TEXT,
-                FOREIGN KEY (medicine_id) REFERENCES medicines(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS intake_history (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                medicine_id INTEGER NOT NULL,
-                taken_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                scheduled_time TEXT,
-                status TEXT,
-                FOREIGN KEY (medicine_id) REFERENCES medicines(id) ON DELETE CASCADE
-            )
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS medicines (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    medicine_name TEXT NOT NULL,
+                    dosage TEXT,
+                    form TEXT,
+                    frequency TEXT,
+                    notes TEXT,
+                    active_ingredients TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            cursor.execute(''' 
+                CREATE TABLE IF NOT EXISTS intake_schedule (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    medicine_id INTEGER NOT NULL,
+                    time_of_day TEXT NOT NULL,
+                    with_food TEXT,
+                    special_instructions TEXT,
+                    FOREIGN KEY (medicine_id) REFERENCES medicines(id) ON DELETE CASCADE
+                )
+            ''')
+            
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS intake_history (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    medicine_id INTEGER NOT NULL,
+                    taken_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    scheduled_time TEXT,
+                    status TEXT,
+                    FOREIGN KEY (medicine_id) REFERENCES medicines(id) ON DELETE CASCADE
+                )
+            ''')
+            
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedule_medicine ON intake_schedule (medicine_id)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_schedule_time ON intake_schedule (time_of_day)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS idx_history_medicine_taken ON intake_history (medicine_id, taken_at)')
+            
+            self.fts_enabled = self.init_fts(cursor)
+
+    def init_fts(self, cursor):
+        # full-text index over names and ingredients, kept in sync by triggers;
+        # the trigram tokenizer needs SQLite 3.34+, older builds fall back to LIKE
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'medicines_fts'")
+        exists = cursor.fetchone() is not None
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS medicines_fts USING fts5(
+                    medicine_name, active_ingredients,
+                    content='medicines', content_rowid='id', tokenize='trigram'
+                )
+            ''')
+        except sqlite3.OperationalError as e:
+            print(f"Full-text search unavailable, using LIKE: {e}")
+            return False
+        
+        cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS medicines_fts_insert AFTER INSERT ON medicines BEGIN
+                INSERT INTO medicines_fts (rowid, medicine_name, active_ingredients)
+                VALUES (new.id, new.medicine_name, new.active_ingredients);
+            END;
+            CREATE TRIGGER IF NOT EXISTS medicines_fts_delete AFTER DELETE ON medicines BEGIN
+                INSERT INTO medicines_fts (medicines_fts, rowid, medicine_name, active_ingredients)
+                VALUES ('delete', old.id, old.medicine_name, old.active_ingredients);
+            END;
+            CREATE TRIGGER IF NOT EXISTS medicines_fts_update AFTER UPDATE ON medicines BEGIN
+                INSERT INTO medicines_fts (medicines_fts, rowid, medicine_name, active_ingredients)
+                VALUES ('delete', old.id, old.medicine_name, old.active_ingredients);
+                INSERT INTO medicines_fts (rowid, medicine_name, active_ingredients)
+                VALUES (new.id, new.medicine_name, new.active_ingredients);
+            END;
         ''')
-        
-        conn.commit()
-        conn.close()
+        if not exists:
+            # index the medicines that were added before the table existed
+            cursor.execute("INSERT INTO medicines_fts (medicines_fts) VALUES ('rebuild')")
+        return True
 
 
     def add_medicine(self, name, dosage="", form="", frequency="", notes="", active_ingredients=""):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO medicines (medicine_name, dosage, form, frequency, notes, active_ingredients)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (name, dosage, form, frequency, notes, active_ingredients))
-        
-        medicine_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO medicines (medicine_name, dosage, form, frequency, notes, active_ingredients)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', (name, dosage, form, frequency, notes, active_ingredients))
+            
+            medicine_id = cursor.lastrowid
+        self._reindex(medicine_id)
         return medicine_id
 
 
     def delete_medicine(self, medicine_id):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM medicines WHERE id = ?', (medicine_id,))
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('DELETE FROM medicines WHERE id = ?', (medicine_id,))
+        index = self._loaded_index()
+        if index is not None:
+            index.remove(medicine_id)
+        self._invalidate_schedules()
 
 
     def update_medicine(self, medicine_id, name, dosage, form, frequency, notes, active_ingredients):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            UPDATE medicines 
-            SET medicine_name = ?, dosage = ?, form = ?, frequency = ?, 
-                notes = ?, active_ingredients = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        ''', (name, dosage, form, frequency, notes, active_ingredients, medicine_id))
-        
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                UPDATE medicines 
+                SET medicine_name = ?, dosage = ?, form = ?, frequency = ?, 
+                    notes = ?, active_ingredients = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            ''', (name, dosage, form, frequency, notes, active_ingredients, medicine_id))
+        self._reindex(medicine_id)
+        self._invalidate_schedules()
+
+    def medicine_index(self):
+        """Fuzzy name/ingredient index, built from the table on first use."""
+        key = os.path.abspath(self.db_name)
+        with _medicine_indexes_lock:
+            if key not in _medicine_indexes:
+                _medicine_indexes[key] = MedicineIndex(self.get_all_medicines())
+            return _medicine_indexes[key]
+
+    def _loaded_index(self):
+        # an index that was never built is read fresh when first needed
+        with _medicine_indexes_lock:
+            return _medicine_indexes.get(os.path.abspath(self.db_name))
+
+    def _reindex(self, medicine_id):
+        index = self._loaded_index()
+        if index is not None:
+            row = self.get_medicine_by_id(medicine_id)
+            if row is not None:
+                index.add(row)
+            else:
+                index.remove(medicine_id)
 
     def get_medicine_by_id(self, medicine_id):
-        conn = sqlite3.connect(self.db_name)
+        conn = self.pool.connection()
         cursor = conn.cursor()
         
         cursor.execute('SELECT * FROM medicines WHERE id = ?', (medicine_id,))
         medicine = cursor.fetchone()
         
-        conn.close()
         return medicine
     
     def get_all_medicines(self):
-        conn = sqlite3.connect(self.db_name)
+        conn = self.pool.connection()
         cursor = conn.cursor()
         
         cursor.execute('SELECT * FROM medicines ORDER BY medicine_name')
         medicines = cursor.fetchall()
         
-        conn.close()
         return medicines
 
     def add_schedule(self, medicine_id, time_of_day, with_food="No preference", special_instructions=""):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO intake_schedule (medicine_id, time_of_day, with_food, special_instructions)
-            VALUES (?, ?, ?, ?)
-        ''', (medicine_id, time_of_day, with_food, special_instructions))
-        
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO intake_schedule (medicine_id, time_of_day, with_food, special_instructions)
+                VALUES (?, ?, ?, ?)
+            ''', (medicine_id, time_of_day, with_food, special_instructions))
+        self._invalidate_schedules()
 
     def delete_schedule(self, schedule_id):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('DELETE FROM intake_schedule WHERE id = ?', (schedule_id,))
-        
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('DELETE FROM intake_schedule WHERE id = ?', (schedule_id,))
+        self._invalidate_schedules()
 
     def get_schedules_for_medicine(self, medicine_id):
-        conn = sqlite3.connect(self.db_name)
+        conn = self.pool.connection()
         cursor = conn.cursor()
         
         cursor.execute('SELECT * FROM intake_schedule WHERE medicine_id = ?', (medicine_id,))
         schedules = cursor.fetchall()
         
-        conn.close()
         return schedules
-    
-    def get_current_schedule(self):
-        current_time = datetime.now().strftime("%H:%M")
-        
-        conn = sqlite3.connect(self.db_name)
+
+    def get_medicines_with_schedules(self):
+        """
+        Every medicine with its schedules as (medicine, [schedule, ...])
+        pairs, ordered by name, from a single query. Medicine and schedule
+        tuples have the same columns as their own tables.
+        """
+        medicine_columns = ('id', 'medicine_name', 'dosage', 'form', 'frequency', 'notes',
+                            'active_ingredients', 'created_at', 'updated_at')
+        schedule_columns = ('id', 'medicine_id', 'time_of_day', 'with_food', 'special_instructions')
+        
+        conn = self.pool.connection()
         cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT m.*, s.time_of_day, s.with_food, s.special_instructions
+        cursor.execute(f'''
+            SELECT {", ".join("m." + c for c in medicine_columns)},
+                   {", ".join("s." + c for c in schedule_columns)}
             FROM medicines m
-            JOIN intake_schedule s ON m.id = s.medicine_id
-            ORDER BY s.time_of_day
+            LEFT JOIN intake_schedule s ON s.medicine_id = m.id
+            ORDER BY m.medicine_name, m.id, s.id
         ''')
-        
-        schedules = cursor.fetchall()
-        conn.close()
-        return schedules
+        rows = cursor.fetchall()
+        
+        split = len(medicine_columns)
+        medicines = {}
+        for row in rows:
+            medicine, schedule = row[:split], row[split:]
+            schedules = medicines.setdefault(medicine[0], (medicine, []))[1]
+            if schedule[0] is not None:
+                schedules.append(schedule)
+        return list(medicines.values())
+    
+    def schedule_index(self):
+        """Minute-of-day index of all intake times, built on first use after a change."""
+        key = os.path.abspath(self.db_name)
+        with _schedule_indexes_lock:
+            if key not in _schedule_indexes:
+                _schedule_indexes[key] = ScheduleIndex(self.get_medicines_with_schedules())
+            return _schedule_indexes[key]
+
+    def _invalidate_schedules(self):
+        with _schedule_indexes_lock:
+            _schedule_indexes.pop(os.path.abspath(self.db_name), None)
+
+    def due_schedules(self, window_minutes=60, medicine_id=None, now=None):
+        """Schedules within window_minutes of now as (medicine, schedule, minutes away)."""
+        return self.schedule_index().due(now, window_minutes, medicine_id)
+    
+    def get_current_schedule(self, window_minutes=60):
+        # medicine columns followed by time_of_day, with_food, special_instructions
+        return [medicine + schedule[2:] for medicine, schedule, _ in self.due_schedules(window_minutes)]
     
     def log_intake(self, medicine_id, scheduled_time, status="Taken"):
-        conn = sqlite3.connect(self.db_name)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO intake_history (medicine_id, scheduled_time, status)
-            VALUES (?, ?, ?)
-        ''', (medicine_id, scheduled_time, status))
-        
-        conn.commit()
-        conn.close()
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                INSERT INTO intake_history (medicine_id, scheduled_time, status)
+                VALUES (?, ?, ?)
+            ''', (medicine_id, scheduled_time, status))
 
     def search_medicine_by_name(self, search_term):
-        conn = sqlite3.connect(self.db_name)
+        conn = self.pool.connection()
         cursor = conn.cursor()
         
         search_pattern = f"%{search_term}%"
@@ -184,7 +288,38 @@ class MedicineDatabase:
         ''', (search_pattern, search_pattern))
         
         medicines = cursor.fetchall()
-        conn.close()
+        return medicines
+
+    def search_medicines_ranked(self, search_term, limit=None, any_word=False):
+        """
+        Medicines whose name or ingredients contain `search_term`, best
+        match first (names weigh more than ingredients), at most `limit`
+        of them (all by default). With `any_word` a row matching any word
+        of the term counts, which suits OCR text.
+        """
+        words = [w for w in re.findall(r"\w+", search_term) if len(w) >= 3]
+        if not self.fts_enabled or not words:
+            # trigram search needs at least 3 characters
+            return self.search_medicine_by_name(search_term)[:limit]
+        
+        quote = lambda text: '"' + text.replace('"', '""') + '"'
+        if any_word:
+            query = " OR ".join(quote(w) for w in words)
+        else:
+            query = quote(search_term.strip())
+        
+        conn = self.pool.connection()
+        cursor = conn.cursor()
+        
+        cursor.execute('''
+            SELECT m.* FROM medicines_fts f
+            JOIN medicines m ON m.id = f.rowid
+            WHERE medicines_fts MATCH ?
+            ORDER BY bm25(medicines_fts, 10.0, 1.0)
+            LIMIT ?
+        ''', (query, -1 if limit is None else limit))
+        
+        medicines = cursor.fetchall()
         return medicines
 
 
@@ -516,7 +651,7 @@ class MedicineDatabaseGUI:
             self.refresh_medicine_list()
             return
         
-        medicines = self.db.search_medicine_by_name(search_term)
+        medicines = self.db.search_medicines_ranked(search_term)
         for med in medicines:
             self.medicine_tree.insert('', tk.END, values=(med[0], med[1], med[2], med[3], med[4]))
         
@@ -668,9 +803,7 @@ class MedicineDatabaseGUI:
         for item in self.schedule_tree.get_children():
             self.schedule_tree.delete(item)
         
-        medicines = self.db.get_all_medicines()
-        for med in medicines:
-            schedules = self.db.get_schedules_for_medicine(med[0])
+        for med, schedules in self.db.get_medicines_with_schedules():
             for schedule in schedules:
                 self.schedule_tree.insert('', tk.END, values=(
                     schedule[0],
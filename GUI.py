@@ -9,20 +9,27 @@ from tkinter import ttk, filedialog, scrolledtext
 from PIL import Image, ImageTk
 import cv2
 import numpy as np
-from ultralytics import YOLO
 import threading
 try:
     import speech_recognition as sr
     VOICE_ENABLED = True
 except ImportError:
     VOICE_ENABLED = False
-import pytesseract
 import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 import sqlite3
-from difflib import SequenceMatcher
 from datetime import datetime, timedelta
 from Database import MedicineDatabase
+from inference import load_detector
+from camera import FrameGrabber
+from pipeline import LatestSlot, PipelineStage
+from scheduler import AdaptiveDetector
+from tracker import IoUTracker
+from ocr_engine import get_engine
+from text_regions import read_text
+from ocr_fusion import fuse_texts
 
 import customtkinter as ctk
 
@@ -49,12 +56,14 @@ STATE_SCAN = 0
 STATE_GUIDE = 1
 CONFIRMATION_TIME = 1.0
 FRAME_GUIDANCE_COOLDOWN = 1.5
+TARGET_FPS = 15.0  # YOLO is skipped on in-between frames to hold this rate
+UI_POLL_MS = 10  # how often the Tk loop checks for a new inferred frame
+LISTBOX_REFRESH_HZ = 4.0  # detected-objects list updates per second
 
 #global variables
 last_command_time = 0
-spoken_objects_global = set()
-detection_start_time = {}
-last_guidance_time = {}
+spoken_objects_global = set()  # track IDs already announced
+last_guidance_time = {}  # track ID -> last guidance time
 voice_command = None
 voice_command_lock = threading.Lock()
 tts_queue = queue.Queue()
@@ -128,144 +137,128 @@ def listen_for_commands(app):
                 app.log_command(f"Listener error: {e}")
 
 # ocr
+# OCR preprocessing variants, each takes the grayscale crop
+def ocr_variant_gray(gray):
+    # Method 1 the Direct grayscale one
+    return gray, 6
+
+def ocr_variant_adaptive(gray):
+    # Method 2 the Adaptive threshold one
+    return cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2), 6
+
+def ocr_variant_otsu(gray):
+    # Method 3 Otsu threshold with denoising
+    denoised = cv2.fastNlMeansDenoising(gray, h=10)
+    _, thresh = cv2.threshold(denoised, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    return thresh, 6
+
+def ocr_variant_equalized(gray):
+    # Method 4 Enhanced contrast one
+    return cv2.equalizeHist(gray), 11
+
+def ocr_variant_inverted(gray):
+    # Method 5 Inverted for white text on dark background
+    return cv2.bitwise_not(gray), 6
+
+OCR_VARIANTS = [ocr_variant_gray, ocr_variant_adaptive, ocr_variant_otsu,
+                ocr_variant_equalized, ocr_variant_inverted]
+OCR_EARLY_EXIT_CONF = 80.0  # mean tesseract word confidence (0-100) that ends a READ early
+OCR_TEXT_LINES = False  # OCR the detected text lines instead of the whole crop, see text_regions.read_text
+# tesseract and OpenCV release the GIL, so threads are enough
+OCR_POOL = ThreadPoolExecutor(max_workers=len(OCR_VARIANTS), thread_name_prefix="ocr")
+READ_FRAMES = 3  # recent crops of the selected object fused by READ
+# separate pool: each frame job waits on its variants in OCR_POOL
+READ_POOL = ThreadPoolExecutor(max_workers=READ_FRAMES, thread_name_prefix="read")
+# READ and VERIFY run here so OCR and database lookups never block the Tk loop
+GUI_TASKS = ThreadPoolExecutor(max_workers=1, thread_name_prefix="gui-task")
+
+def run_ocr_variant(variant, gray):
+    """Returns the variant's text and its mean word confidence."""
+    image, psm = variant(gray)
+    return get_engine().read_with_confidence(image, psm)
+
+def crop_bbox(frame, bbox):
+    xmin, ymin, xmax, ymax = bbox
+    
+    # Ensure valid bbox
+    h, w = frame.shape[:2]
+    xmin = max(0, xmin)
+    ymin = max(0, ymin)
+    xmax = min(w, xmax)
+    ymax = min(h, ymax)
+    
+    if xmax <= xmin or ymax <= ymin:
+        return None
+    return frame[ymin:ymax, xmin:xmax]
+
 def do_ocr_on_bbox(frame, bbox):
+    crop_img = crop_bbox(frame, bbox)
+    if crop_img is None:
+        return ""
+    return ocr_crop(crop_img)[0]
+
+def ocr_crop(crop_img):
+    """Best text of the preprocessing variants and its confidence."""
     try:
-        xmin, ymin, xmax, ymax = bbox
-        
-        # Ensure valid bbox
-        h, w = frame.shape[:2]
-        xmin = max(0, xmin)
-        ymin = max(0, ymin)
-        xmax = min(w, xmax)
-        ymax = min(h, ymax)
-        
-        if xmax <= xmin or ymax <= ymin:
-            return ""
-        
-        crop_img = frame[ymin:ymax, xmin:xmax]
-        
         # Skiping if crop is too small
         if crop_img.shape[0] < 20 or crop_img.shape[1] < 20:
-            return ""
-        
-        # Trying multiple preprocessing techniques
-        results = []
+            return "", 0.0
         
-        # Method 1 the Direct grayscale one
         gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
-        text = pytesseract.image_to_string(gray, config='--psm 6').strip()
-        if text:
-            results.append(text)
-        
-        # Method 2 the Adaptive threshold one
-        gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
-        thresh = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
-        text = pytesseract.image_to_string(thresh, config='--psm 6').strip()
-        if text:
-            results.append(text)
-        
-        # Method 3 Otsu threshold with denoising
-        gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
-        gray = cv2.fastNlMeansDenoising(gray, h=10)
-        _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-        text = pytesseract.image_to_string(thresh, config='--psm 6').strip()
-        if text:
-            results.append(text)
-        
-        # Method 4 Enhanced contrast one
-        gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
-        gray = cv2.equalizeHist(gray)
-        text = pytesseract.image_to_string(gray, config='--psm 11').strip()
-        if text:
-            results.append(text)
-        
-        # Method 5 Inverted for white text on dark background
-        gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
-        inverted = cv2.bitwise_not(gray)
-        text = pytesseract.image_to_string(inverted, config='--psm 6').strip()
-        if text:
-            results.append(text)
-        
-        # Return longest result
-        if results:
-            return max(results, key=len)
-        return ""
+        if OCR_TEXT_LINES:
+            return read_text(gray, ocr_variants)
+        return ocr_variants(gray)
         
     except Exception as e:
         print(f"OCR Error: {e}")
-        return ""
+        return "", 0.0
+
+def ocr_variants(gray):
+    """Runs every preprocessing variant on a grayscale image in parallel."""
+    jobs = [OCR_POOL.submit(run_ocr_variant, variant, gray) for variant in OCR_VARIANTS]
+    
+    results = []
+    try:
+        for job in as_completed(jobs):
+            text, conf = job.result()
+            if not text:
+                continue
+            results.append((text, conf))
+            # Confident enough, no need to wait for the slower variants
+            if conf >= OCR_EARLY_EXIT_CONF and len(text) > 2:
+                return text, conf
+    finally:
+        for job in jobs:
+            job.cancel()
+    
+    # Return longest result
+    if results:
+        return max(results, key=lambda r: len(r[0]))
+    return "", 0.0
     
 
 
 #--- database function for medicine verification
 
-#text similarity checking function
-def calculate_similarity(text1, text2):
-    return SequenceMatcher(None, text1.lower(), text2.lower()).ratio()
-
 # ----best matching medicine from dataset based on ocr results
-def find_best_medicine_match(ocr_text, medicines):
-    best_match = None
-    best_score = 0
-    
-    ocr_lower = ocr_text.lower()
-    
-    for med in medicines:
-        med_id, name, dosage, form, freq, notes, ingredients, created, updated = med
-        
-        # Checking medicine name
-        name_score = calculate_similarity(ocr_lower, name.lower())
-        
-        # Checking active ingredients (anything text that is along with medicine in small letter and such)
-        ingredient_score = 0
-        if ingredients:
-            ingredient_score = calculate_similarity(ocr_lower, ingredients.lower())
-        
-        # Checking if any part of OCR text contains medicine name or ingredients
-        contains_score = 0
-        if name.lower() in ocr_lower or ocr_lower in name.lower():
-            contains_score = 0.8
-        if ingredients and (ingredients.lower() in ocr_lower or ocr_lower in ingredients.lower()):
-            contains_score = max(contains_score, 0.8)
-        
-        # Taking the best score
-        final_score = max(name_score, ingredient_score, contains_score)
-        
-        if final_score > best_score:
-            best_score = final_score
-            best_match = med
-    
+def find_best_medicine_match(ocr_text, medicine_index, extra_rows=()):
     # Only returning if confidence is about around 40 % for now
-    if best_score > 0.4:
-        return best_match, best_score
-    return None, 0
+    return medicine_index.best_match(ocr_text, min_score=0.4, extra_rows=extra_rows)
 
 
 # ------ verifying if the retrieved medicine time is right now or not
 def check_medicine_schedule(medicine_id, db, time_window_minutes=60):
-    current_time = datetime.now()
-    current_time_str = current_time.strftime("%H:%M")
-    
-    schedules = db.get_schedules_for_medicine(medicine_id)
-    
-    for schedule in schedules:
-        schedule_time_str = schedule[2]  # the current time of the day
-        schedule_time = datetime.strptime(schedule_time_str, "%H:%M").time()
-        
-        # Converting to datetime for comparison
-        schedule_datetime = datetime.combine(current_time.date(), schedule_time)
-        
-        # Checking if within time window
-        time_diff = abs((current_time - schedule_datetime).total_seconds() / 60)
-        
-        if time_diff <= time_window_minutes:
-            return True, schedule, time_diff
+    # closest intake time in the window, which may reach across midnight
+    due = db.due_schedules(time_window_minutes, medicine_id)
+    if due:
+        _, schedule, time_diff = min(due, key=lambda d: d[2])
+        return True, schedule, time_diff
     
     return False, None, None
 
 # gui
 class VisionAssistantGUI:
-    def __init__(self, root, default_model_path=None):
+    def __init__(self, root, default_model_path=None, replay_realtime=True, replay_fps=None):
         self.root = root
         self.root.title("Vision Assistant System")
         self.root.geometry("1200x800")
@@ -275,24 +268,39 @@ class VisionAssistantGUI:
         self.capturing = False
         self.model = None
         self.labels = None
+        self.tracker = IoUTracker()
+        self.tracker_lock = threading.Lock()  # the inference worker updates it, the Tk loop reads it
+        self.worker = None
+        self.results = None
+        self.task_running = False  # a READ or VERIFY is in progress on GUI_TASKS
+        
+        # Display buffers, reallocated only when the canvas or frame size changes
+        self.canvas_image = None
+        self.photo = None
+        self.display_buf = None
+        self.display_key = None
+        
+        # Objects listbox rows, one track ID per row
+        self.listbox_refresh_hz = LISTBOX_REFRESH_HZ
+        self.listbox_rows = []
+        self.listbox_updated = 0.0
         self.default_model_path = default_model_path
+        self.replay_realtime = replay_realtime  # False replays files as fast as inference runs
+        self.replay_fps = replay_fps
         self.cap = None
         self.current_state = STATE_SCAN
         self.active_object = None
         self.active_object_bbox = None
+        self.active_track_id = None
+        self.recent_crops = deque(maxlen=READ_FRAMES)  # latest crops of the active track for READ
         self.conf_threshold = 0.5
         self.source_type = None
         self.resize = False
         self.resW, self.resH = 640, 480
         
-        # FPS tracking
-        self.fps_buffer = []
-        self.fps_avg_len = 200
-        
         # Detection tracking
-        global spoken_objects_global, detection_start_time, last_guidance_time
+        global spoken_objects_global, last_guidance_time
         spoken_objects_global = set()
-        detection_start_time = {}
         last_guidance_time = {}
         
         # Colors
@@ -351,6 +359,7 @@ class VisionAssistantGUI:
 
         ctk.CTkButton(source_frame, text="Webcam",command=self.start_webcam,height=35,corner_radius=8,font=ctk.CTkFont(size=13)).pack(fill=tk.X, padx=15, pady=(0, 5))
         ctk.CTkButton(source_frame, text="Video File",command=self.load_video,height=35,corner_radius=8,font=ctk.CTkFont(size=13)).pack(fill=tk.X, padx=15, pady=(0, 5))
+        ctk.CTkButton(source_frame, text="Image Folder",command=self.load_image_folder,height=35,corner_radius=8,font=ctk.CTkFont(size=13)).pack(fill=tk.X, padx=15, pady=(0, 5))
         ctk.CTkButton(source_frame, text="Stop",command=self.stop_capture,height=35,corner_radius=8,font=ctk.CTkFont(size=13)).pack(fill=tk.X, padx=15, pady=(0, 15))
 
 
@@ -507,16 +516,16 @@ class VisionAssistantGUI:
             speak("Error opening database manager")
         
     def load_model(self):
-        model_path = filedialog.askopenfilename(title="Select YOLO Model",filetypes=[("PyTorch Model", "*.pt"), ("All Files", "*.*")])
+        model_path = filedialog.askopenfilename(title="Select YOLO Model",filetypes=[("PyTorch Model", "*.pt"), ("ONNX Model", "*.onnx"), ("OpenVINO Model", "*.xml"), ("All Files", "*.*")])
         if model_path:
             self.load_model_from_path(model_path)
     
     def load_model_from_path(self, model_path):
         try:
-            self.model = YOLO(model_path)
+            self.model = AdaptiveDetector(load_detector(model_path), TARGET_FPS)
             self.labels = self.model.names
             self.model_label.configure(text=os.path.basename(model_path), fg="green")
-            self.log_command(f"Model loaded: {os.path.basename(model_path)}")
+            self.log_command(f"Model loaded: {os.path.basename(model_path)} ({self.model.backend})")
             speak("Model loaded successfully")
         except Exception as e:
             self.log_command(f"Error loading model: {e}")
@@ -528,39 +537,80 @@ class VisionAssistantGUI:
             speak("Please load a model first")
             return
         
+        self.stop_worker()
         self.source_type = 'webcam'
-        self.cap = cv2.VideoCapture(0)
-        self.cap.set(3, self.resW)
-        self.cap.set(4, self.resH)
-        self.capturing = True
+        self.model.reset()
+        self.tracker.reset()
+        self.recent_crops.clear()
+        try:
+            self.cap = FrameGrabber(0, width=self.resW, height=self.resH).start()
+        except IOError as e:
+            self.log_command(f"Error opening webcam: {e}")
+            speak("Cannot open webcam")
+            return
+        self.start_worker()
         self.log_command("Webcam started")
         speak("Webcam started")
         # Delaying to ensure that the canvas is ready
         self.root.after(100, self.process_video)
     
     def load_video(self):
-        if not self.model:
-            self.log_command("Please load a model first")
-            speak("Please load a model first")
-            return
-        
         video_path = filedialog.askopenfilename(
             title="Select Video File",
             filetypes=[("Video Files", "*.mp4 *.avi *.mov *.mkv"), ("All Files", "*.*")]
         )
         if video_path:
-            self.source_type = 'video'
-            self.cap = cv2.VideoCapture(video_path)
-            self.capturing = True
-            self.log_command(f"Video loaded: {os.path.basename(video_path)}")
-            speak("Video loaded")
-            self.process_video()
+            self.start_replay(video_path)
     
-    def stop_capture(self):
+    def load_image_folder(self):
+        folder = filedialog.askdirectory(title="Select Image Folder")
+        if folder:
+            self.start_replay(folder)
+    
+    def start_replay(self, path):
+        # a video file or an image folder played like a live camera, no hardware needed
+        if not self.model:
+            self.log_command("Please load a model first")
+            speak("Please load a model first")
+            return
+        
+        self.stop_worker()
+        self.source_type = 'video'
+        self.model.reset()
+        self.tracker.reset()
+        self.recent_crops.clear()
+        try:
+            self.cap = FrameGrabber(path, realtime=self.replay_realtime, fps=self.replay_fps).start()
+        except IOError as e:
+            self.log_command(f"Error opening video: {e}")
+            speak("Cannot open video")
+            return
+        self.start_worker()
+        self.log_command(f"Video loaded: {os.path.basename(path)}")
+        speak("Video loaded")
+        self.process_video()
+    
+    def start_worker(self):
+        # capture and inference run off the Tk thread; process_video only shows the newest result
+        self.objects_listbox.delete(0, tk.END)
+        self.listbox_rows = []
+        self.capturing = True
+        self.results = LatestSlot()
+        self.worker = PipelineStage("gui-inference", self.infer_frame, lambda: self.capturing,
+                                    outbox=self.results)
+        self.worker.start()
+    
+    def stop_worker(self):
         self.capturing = False
+        if self.worker is not None:
+            self.worker.join(timeout=2.0)
+            self.worker = None
         if self.cap:
             self.cap.release()
             self.cap = None
+    
+    def stop_capture(self):
+        self.stop_worker()
         self.log_command("Capture stopped")
         speak("Capture stopped")
     
@@ -610,7 +660,7 @@ class VisionAssistantGUI:
             gray = cv2.cvtColor(self.current_frame, cv2.COLOR_BGR2GRAY)
             
             # Try OCR
-            text = pytesseract.image_to_string(gray, config='--psm 3').strip()
+            text = get_engine().read(gray, psm=3)
             
             if text:
                 self.ocr_text.delete('1.0', tk.END)
@@ -629,10 +679,16 @@ class VisionAssistantGUI:
         selection = self.objects_listbox.curselection()
         if selection and hasattr(self, 'current_detections'):
             idx = selection[0]
-            if idx < len(self.current_detections):
-                det = self.current_detections[idx]
-                self.active_object_bbox = det['bbox']
-                self.active_object = det['class']
+            if idx < len(self.listbox_rows):
+                # rows stay put between refreshes, so look the row's track up by ID
+                track_id, _ = self.listbox_rows[idx]
+                matches = self.current_detections[self.current_detections['track_id'] == track_id]
+                if not len(matches):
+                    return
+                det = matches[0]
+                self.active_track_id = int(det['track_id'])
+                self.active_object_bbox = det['bbox'].tolist()
+                self.active_object = self.labels[int(det['class_id'])]
                 self.current_state = STATE_GUIDE
                 self.set_guide_mode()
                 speak(f"{self.active_object} selected")
@@ -646,11 +702,12 @@ class VisionAssistantGUI:
             self.log_text.delete('1.0', '2.0')
     
     def handle_select_command(self):
-        if hasattr(self, 'current_detections') and self.current_detections:
+        if hasattr(self, 'current_detections') and len(self.current_detections):
             # Selecting largest object
-            largest = max(self.current_detections, key=lambda d: (d['bbox'][2] - d['bbox'][0]) * (d['bbox'][3] - d['bbox'][1]))
-            self.active_object_bbox = largest['bbox']
-            self.active_object = largest['class']
+            largest = self.current_detections[self.current_detections['area'].argmax()]
+            self.active_track_id = int(largest['track_id'])
+            self.active_object_bbox = largest['bbox'].tolist()
+            self.active_object = self.labels[int(largest['class_id'])]
             self.current_state = STATE_GUIDE
             self.set_guide_mode()
             speak(f"{self.active_object} selected")
@@ -664,13 +721,9 @@ class VisionAssistantGUI:
                 return
             
             # Checking if object still visible
-            current_bbox = None
-            if hasattr(self, 'current_detections'):
-                for det in self.current_detections:
-                    if det['class'] == self.active_object:
-                        current_bbox = det['bbox']
-                        break
-            
+            with self.tracker_lock:
+                track = self.tracker.visible(self.active_track_id)
+                current_bbox = list(track.bbox) if track is not None else None
             if current_bbox is None:
                 speak("Object not visible")
                 return
@@ -690,51 +743,63 @@ class VisionAssistantGUI:
                 speak("Reading text now")
                 self.log_command("Starting OCR...")
                 
-                # Multi-frame OCR for better results
-                ocr_results = []
-                frames_to_process = 3  # Currently working best at 3 fps
-                
-                for attempt in range(frames_to_process):
-                    if self.cap and self.capturing:
-                        ret, fresh_frame = self.cap.read()
-                        if not ret:
-                            break
-                        
-                        fresh_results = self.model(fresh_frame, verbose=False)
-                        fresh_detections = fresh_results[0].boxes
-                        
-                        for det in fresh_detections:
-                            if self.labels[int(det.cls.item())] == self.active_object:
-                                fresh_bbox = det.xyxy.cpu().numpy().squeeze().astype(int)
-                                text = do_ocr_on_bbox(fresh_frame, fresh_bbox)
-                                if text and len(text) > 2:
-                                    ocr_results.append(text)
-                                    self.log_command(f"OCR attempt {attempt+1}: {text[:50]}...")
-                                break
-                    else:
-                        text = do_ocr_on_bbox(self.current_frame, current_bbox)
-                        if text and len(text) > 2:
-                            ocr_results.append(text)
-                            self.log_command(f"OCR result: {text[:50]}...")
-                        break
+                # Multi-frame OCR on the crops the live loop already captured
+                crops = [crop for track_id, crop in list(self.recent_crops) if track_id == self.active_track_id]
+                if not crops:
+                    crop = crop_bbox(self.current_frame, current_bbox)
+                    crops = [crop] if crop is not None else []
                 
-                if ocr_results:
-                    # Getting the longest result
-                    best_text = max(ocr_results, key=len)
-                    self.ocr_text.delete('1.0', tk.END)
-                    self.ocr_text.insert('1.0', best_text)
-                    
-                    # Speaks the first 100 characters
-                    speak_text = best_text[:100] if len(best_text) > 100 else best_text
-                    speak(f"Text reads: {speak_text}")
-                    self.log_command(f"Final OCR result: {best_text}")
-                else:
-                    self.log_command("No text detected in any frame")
-                    speak("No readable text found. Try better lighting or hold object steady")
+                self.run_in_background(lambda: list(READ_POOL.map(ocr_crop, crops)), self.show_read_result)
         else:
             speak("Please select an object first in guide mode")
             self.log_command("No object selected for OCR")
     
+    def run_in_background(self, work, done):
+        """Runs work() on GUI_TASKS, then done(result) on the Tk thread. One task at a time."""
+        if self.task_running:
+            speak("Still working, please wait")
+            return False
+        self.task_running = True
+        
+        def job():
+            try:
+                result = work()
+            except Exception as e:
+                result = e
+            self.root.after(0, self.finish_task, done, result)
+        
+        GUI_TASKS.submit(job)
+        return True
+    
+    def finish_task(self, done, result):
+        self.task_running = False
+        if isinstance(result, Exception):
+            self.log_command(f"Error: {result}")
+            speak("Something went wrong, please try again")
+            return
+        done(result)
+    
+    def show_read_result(self, results):
+        ocr_results = []
+        for attempt, (text, conf) in enumerate(results):
+            if text and len(text) > 2:
+                ocr_results.append((text, conf))
+                self.log_command(f"OCR attempt {attempt+1}: {text[:50]}... ({conf:.0f})")
+        
+        if ocr_results:
+            # Voting across frames, weighted by tesseract confidence
+            best_text = fuse_texts(ocr_results)
+            self.ocr_text.delete('1.0', tk.END)
+            self.ocr_text.insert('1.0', best_text)
+            
+            # Speaks the first 100 characters
+            speak_text = best_text[:100] if len(best_text) > 100 else best_text
+            speak(f"Text reads: {speak_text}")
+            self.log_command(f"Final OCR result: {best_text}")
+        else:
+            self.log_command("No text detected in any frame")
+            speak("No readable text found. Try better lighting or hold object steady")
+    
 
 
     # verifying if whether the detected medicien is safe to take or not.
@@ -751,34 +816,38 @@ class VisionAssistantGUI:
         speak("Verifying medicine")
         self.log_command(f"Verifying: {ocr_text[:50]}...")
         
-        # Get all medicines from database
-        medicines = self.medicine_db.get_all_medicines()
+        # matching and the schedule lookups run off the Tk thread
+        self.run_in_background(lambda: self.match_medicine(ocr_text), self.show_verification)
+    
+    def match_medicine(self, ocr_text):
+        """Runs on GUI_TASKS; returns (message for the verify box, log line)."""
+        # Fuzzy index of the medicines in the database
+        medicine_index = self.medicine_db.medicine_index()
         
-        if not medicines:
+        if not len(medicine_index):
             speak("No medicines in database. Please add your medicines first")
-            self.verify_text.delete('1.0', tk.END)
-            self.verify_text.insert('1.0', "No medicines in the database\n\nPlease add your medicines in the database first.")
-            return
+            return "No medicines in the database\n\nPlease add your medicines in the database first.", "Database is empty"
         
         # Find best match
-        matched_med, confidence = find_best_medicine_match(ocr_text, medicines)
+        matched_med, confidence = find_best_medicine_match(ocr_text, medicine_index)
+        if not matched_med:
+            # only then are full-text hits on any OCR word worth their cost
+            fts_rows = self.medicine_db.search_medicines_ranked(ocr_text, limit=5, any_word=True)
+            if fts_rows:
+                matched_med, confidence = find_best_medicine_match(ocr_text, medicine_index, fts_rows)
         
         if not matched_med:
             speak("This medicine is not in your database. Please consult your doctor")
-            self.verify_text.delete('1.0', tk.END)
-            self.verify_text.insert('1.0', f"UNRECOGNIZED MEDICINE\n\n")
-            self.verify_text.insert(tk.END, f"Medicine not found in your database.\n\n")
-            self.verify_text.insert(tk.END, f"IMPORTANT: Do not take this medicine without consulting your doctor.\n\n")
+            verify_msg = f"UNRECOGNIZED MEDICINE\n\n"
+            verify_msg += f"Medicine not found in your database.\n\n"
+            verify_msg += f"IMPORTANT: Do not take this medicine without consulting your doctor.\n\n"
             speak("PLEASE TAKE ASSISTANCE. PLEASE REQUEST ASSISTANCE")
-            self.verify_text.insert(tk.END, f"Detected text: {ocr_text[:100]}")
-            self.log_command("Medicine not found in database")
-            return
+            verify_msg += f"Detected text: {ocr_text[:100]}"
+            return verify_msg, "Medicine not found in database"
         
         # Medicine found THEN we will extract details
         med_id, name, dosage, form, freq, notes, ingredients, created, updated = matched_med
         
-        self.log_command(f"Matched: {name} (confidence: {confidence:.2%})")
-        
         # Checking schedule
         is_scheduled, schedule, time_diff = check_medicine_schedule(med_id, self.medicine_db)
         
@@ -827,109 +896,117 @@ class VisionAssistantGUI:
         if notes:
             verify_msg += f"\n\nNotes: {notes}"
         
-        # Displaying in GUI
+        return verify_msg, f"Verification complete: {name} (confidence: {confidence:.2%})"
+    
+    def show_verification(self, result):
+        verify_msg, log_line = result
         self.verify_text.delete('1.0', tk.END)
         self.verify_text.insert('1.0', verify_msg)
-        
-        self.log_command(f"Verification complete: {name}")
+        self.log_command(log_line)
 
 
-    def process_video(self):
-        global spoken_objects_global, detection_start_time, last_guidance_time
-        
-        if not self.capturing or self.cap is None:
-            return
-        
-        t_start = time.perf_counter()
-        
-        ret, frame = self.cap.read()
-        if not ret:
-            self.stop_capture()
-            return
-        
-        self.current_frame = frame.copy()
-        frame_display = frame.copy()
-        
-        frame_height, frame_width = frame.shape[:2]
-        left_zone = frame_width / 3
-        right_zone = 2 * frame_width / 3
+    def infer_frame(self):
+        # runs on the inference worker thread
+        frame, current_time, _ = self.cap.read_stamped(timeout=0.5)
+        if frame is None:
+            if not self.cap.isOpened():
+                self.capturing = False
+            return None
         
         # YOLO inference
-        results = self.model(frame, verbose=False)
-        detections = results[0].boxes
+        records = self.model.detect(frame).records(self.conf_threshold)
+        with self.tracker_lock:
+            detections = self.tracker.update(records, current_time)
+            # Keeping the selected object locked to its track
+            active_track = self.tracker.visible(self.active_track_id)
+            active_bbox = list(active_track.bbox) if active_track is not None else None
+        
+        if active_bbox is not None and self.current_state == STATE_GUIDE:
+            crop = crop_bbox(frame, active_bbox)
+            if crop is not None:
+                self.recent_crops.append((self.active_track_id, crop.copy()))
         
-        # Storing detections for selection
-        self.current_detections = []
-        current_frame_objects = set()
+        frame_display = frame.copy()
         
         # Drawing detections
-        for det in detections:
-            xyxy = det.xyxy.cpu().numpy().squeeze().astype(int)
-            xmin, ymin, xmax, ymax = xyxy
-            class_idx = int(det.cls.item())
-            conf = det.conf.item()
-            
-            if conf < self.conf_threshold:
-                continue
-            
+        for (xmin, ymin, xmax, ymax), conf, class_idx in zip(
+                detections['bbox'].tolist(),
+                detections['conf'].tolist(),
+                detections['class_id'].tolist()):
             classname = self.labels[class_idx]
-            current_frame_objects.add(classname)
-            
-            self.current_detections.append({
-                'class': classname,
-                'conf': conf,
-                'bbox': [xmin, ymin, xmax, ymax]
-            })
-            
             color = self.bbox_colors[class_idx % 10]
             cv2.rectangle(frame_display, (xmin, ymin), (xmax, ymax), color, 2)
             label = f'{classname}: {conf:.2f}'
             cv2.putText(frame_display, label, (xmin, ymin-5), 
                        cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 1)
         
-        # Object announcement logic during SCAN mode
-        current_time = time.time()
+        # Drawing state and info
+        state_text = "SCAN" if self.current_state == STATE_SCAN else "GUIDE"
+        state_color = (0, 255, 0) if self.current_state == STATE_SCAN else (0, 0, 255)
+        cv2.putText(frame_display, f"Mode: {state_text}", (10, 30), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, state_color, 2)
+        cv2.putText(frame_display, f"Objects: {len(detections)}", (10, 60), 
+                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+        
+        return frame, frame_display, detections, active_bbox, current_time
+
+    def process_video(self):
+        global spoken_objects_global, last_guidance_time
+        
+        if not self.capturing:
+            # the worker stops by itself at the end of a video
+            if self.cap is not None:
+                self.stop_capture()
+            return
+        
+        self.handle_voice_command()
         
-        for obj in current_frame_objects:
-            if obj not in detection_start_time:
-                detection_start_time[obj] = current_time
+        result, _ = self.results.get(timeout=0)
+        if result is None:
+            self.root.after(UI_POLL_MS, self.process_video)
+            return
         
-        for obj in list(detection_start_time.keys()):
-            if obj not in current_frame_objects:
-                detection_start_time.pop(obj)
+        frame, frame_display, self.current_detections, active_bbox, current_time = result
+        self.current_frame = frame
+        if active_bbox is not None:
+            self.active_object_bbox = active_bbox
         
+        frame_height, frame_width = frame.shape[:2]
+        left_zone = frame_width / 3
+        right_zone = 2 * frame_width / 3
+        
+        # Object announcement logic during SCAN mode
         if self.current_state == STATE_SCAN:
-            for obj, start_time in detection_start_time.items():
-                if obj not in spoken_objects_global and (current_time - start_time) >= CONFIRMATION_TIME:
+            with self.tracker_lock:
+                tracks = [self.tracker.get(track_id) for track_id in self.current_detections['track_id'].tolist()]
+            for track, x_center in zip(tracks, self.current_detections['cx'].tolist()):
+                if track is None:
+                    continue
+                if track.track_id not in spoken_objects_global and (current_time - track.first_seen) >= CONFIRMATION_TIME:
                     # Finding position
-                    for det in self.current_detections:
-                        if det['class'] == obj:
-                            xmin, ymin, xmax, ymax = det['bbox']
-                            x_center = (xmin + xmax) / 2
-                            if x_center < left_zone:
-                                position = "left"
-                            elif x_center > right_zone:
-                                position = "right"
-                            else:
-                                position = "center"
-                            break
+                    if x_center < left_zone:
+                        position = "left"
+                    elif x_center > right_zone:
+                        position = "right"
+                    else:
+                        position = "center"
                     
-                    speak(f"Detected {obj} on the {position}")
-                    spoken_objects_global.add(obj)
+                    speak(f"Detected {self.labels[track.class_id]} on the {position}")
+                    spoken_objects_global.add(track.track_id)
         
-        spoken_objects_global = spoken_objects_global.intersection(current_frame_objects)
+        # Forgetting tracks that are gone
+        with self.tracker_lock:
+            spoken_objects_global.intersection_update(self.tracker.tracks)
         
         # Guidance mode
         if self.current_state == STATE_GUIDE:
-            for det in self.current_detections:
-                classname = det['class']
-                xmin, ymin, xmax, ymax = det['bbox']
-                
-                bbox_area = (xmax - xmin) * (ymax - ymin)
-                frame_area = frame_width * frame_height
-                area_ratio = bbox_area / frame_area
+            area_ratios = self.current_detections['area'] / (frame_width * frame_height)
+            for track_id, class_idx, area_ratio in zip(self.current_detections['track_id'].tolist(),
+                                                       self.current_detections['class_id'].tolist(),
+                                                       area_ratios.tolist()):
+                classname = self.labels[class_idx]
                 
-                last_time = last_guidance_time.get(classname, 0)
+                last_time = last_guidance_time.get(track_id, 0)
                 
                 if current_time - last_time > FRAME_GUIDANCE_COOLDOWN:
                     if area_ratio < 0.20:
@@ -938,21 +1015,90 @@ class VisionAssistantGUI:
                         speak(f"Move the {classname} slightly away.")
                     else:
                         speak(f"Hold steady on the {classname}.")
-                    last_guidance_time[classname] = current_time
+                    last_guidance_time[track_id] = current_time
         
         # Updating objects listbox
-        self.objects_listbox.delete(0, tk.END)
-        for det in self.current_detections:
-            self.objects_listbox.insert(tk.END, f"{det['class']}: {det['conf']:.2f}")
+        now = time.perf_counter()
+        if now - self.listbox_updated >= 1.0 / self.listbox_refresh_hz:
+            self.listbox_updated = now
+            self.update_objects_listbox()
         
-        # Drawing state and info
-        state_text = "SCAN" if self.current_state == STATE_SCAN else "GUIDE"
-        state_color = (0, 255, 0) if self.current_state == STATE_SCAN else (0, 0, 255)
-        cv2.putText(frame_display, f"Mode: {state_text}", (10, 30), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, state_color, 2)
-        cv2.putText(frame_display, f"Objects: {len(self.current_detections)}", (10, 60), 
-                   cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+        # Displaying the frame
+        self.render_frame(frame_display)
+        
+        # Detection rate of the worker, independent of how often Tk redraws,
+        # and the time from capture to this frame being on screen
+        stats = self.worker.snapshot() if self.worker is not None else None
+        if stats is not None:
+            latency_ms = (time.time() - current_time) * 1000
+            self.fps_label.configure(text=f"FPS: {stats['fps']:.1f} | {latency_ms:.0f} ms")
+        self.status_label.configure(text=f"Status: Capturing | Objects: {len(self.current_detections)}")
+        
+        # Scheduling the next frame
+        self.root.after(UI_POLL_MS, self.process_video)
+    
+    def update_objects_listbox(self):
+        # Only rows whose text changed are rewritten, so the selection is kept
+        wanted = {}
+        for track_id, class_idx, conf in zip(self.current_detections['track_id'].tolist(),
+                                             self.current_detections['class_id'].tolist(),
+                                             self.current_detections['conf'].tolist()):
+            wanted[track_id] = f"{self.labels[class_idx]} #{track_id}: {conf:.2f}"
+        
+        # Removing tracks that are gone, bottom up so indices stay valid
+        for i in range(len(self.listbox_rows) - 1, -1, -1):
+            if self.listbox_rows[i][0] not in wanted:
+                self.objects_listbox.delete(i)
+                del self.listbox_rows[i]
+        
+        selected = set(self.objects_listbox.curselection())
+        for i, (track_id, text) in enumerate(self.listbox_rows):
+            if wanted[track_id] != text:
+                self.objects_listbox.delete(i)
+                self.objects_listbox.insert(i, wanted[track_id])
+                if i in selected:
+                    self.objects_listbox.selection_set(i)
+                self.listbox_rows[i] = (track_id, wanted[track_id])
+        
+        # New tracks go at the end
+        shown = {track_id for track_id, _ in self.listbox_rows}
+        for track_id, text in wanted.items():
+            if track_id not in shown:
+                self.objects_listbox.insert(tk.END, text)
+                self.listbox_rows.append((track_id, text))
+    
+    def render_frame(self, frame):
+        canvas_width = self.canvas.winfo_width()
+        canvas_height = self.canvas.winfo_height()
+        frame_height, frame_width = frame.shape[:2]
         
+        key = (canvas_width, canvas_height, frame_width, frame_height)
+        if key != self.display_key:
+            # Shrinking to fit the canvas, never enlarging
+            scale = 1.0
+            if canvas_width > 1 and canvas_height > 1:
+                scale = min(1.0, canvas_width / frame_width, canvas_height / frame_height)
+            size = (max(1, int(frame_width * scale)), max(1, int(frame_height * scale)))
+            
+            self.display_buf = np.empty((size[1], size[0], 3), dtype=np.uint8)
+            self.photo = ImageTk.PhotoImage("RGB", size)
+            if self.canvas_image is None:
+                self.canvas_image = self.canvas.create_image(canvas_width//2, canvas_height//2,
+                                                             anchor=tk.CENTER, image=self.photo)
+            else:
+                self.canvas.coords(self.canvas_image, canvas_width//2, canvas_height//2)
+                self.canvas.itemconfigure(self.canvas_image, image=self.photo)
+            self.display_key = key
+        
+        buf = self.display_buf
+        if buf.shape[:2] != (frame_height, frame_width):
+            cv2.resize(frame, (buf.shape[1], buf.shape[0]), dst=buf, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(buf, cv2.COLOR_BGR2RGB, dst=buf)
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=buf)
+        self.photo.paste(Image.fromarray(buf))
+    
+    def handle_voice_command(self):
         # Handling the voice commands
         global voice_command
         with voice_command_lock:
@@ -970,46 +1116,27 @@ class VisionAssistantGUI:
                 self.handle_read_command()
             elif cmd == CMD_VERIFY:
                 self.verify_medicine()
-        
-        # Displaying the frame
-        frame_rgb = cv2.cvtColor(frame_display, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(frame_rgb)
-        
-        # Resizing to fit canvas
-        canvas_width = self.canvas.winfo_width()
-        canvas_height = self.canvas.winfo_height()
-        if canvas_width > 1 and canvas_height > 1:
-            img.thumbnail((canvas_width, canvas_height), Image.Resampling.LANCZOS)
-        
-        imgtk = ImageTk.PhotoImage(image=img)
-        self.canvas.create_image(canvas_width//2, canvas_height//2, anchor=tk.CENTER, image=imgtk)
-        self.canvas.imgtk = imgtk
-        
-        # Updating FPS
-        t_stop = time.perf_counter()
-        self.fps_buffer.append(1/(t_stop - t_start))
-        if len(self.fps_buffer) > self.fps_avg_len:
-            self.fps_buffer.pop(0)
-        
-        avg_fps = np.mean(self.fps_buffer) if self.fps_buffer else 0
-        self.fps_label.configure(text=f"FPS: {avg_fps:.1f}")
-        self.status_label.configure(text=f"Status: Capturing | Objects: {len(self.current_detections)}")
-        
-        # Scheduling the next frame
-        self.root.after(10, self.process_video)
     
     def on_closing(self):
         self.running = False
-        self.capturing = False
-        if self.cap:
-            self.cap.release()
+        self.stop_worker()
         tts_queue.put(None)  # Stoping TTS worker
         self.root.destroy()
 
 def main():
     DEFAULT_MODEL = "/Users/rasikdhakal/Desktop/Yolo/my_model_v2/my_model_v2.pt"
+    parser = argparse.ArgumentParser(description="Vision Assistant GUI")
+    parser.add_argument('--model', default=DEFAULT_MODEL, help='YOLO model loaded at start')
+    parser.add_argument('--source', default=None, help='Video file or image folder to replay at start instead of picking a source')
+    parser.add_argument('--replay', default='realtime', choices=['realtime', 'fast'], help='Replay at the file FPS, or every frame as fast as inference runs')
+    parser.add_argument('--replay-fps', type=float, default=0, help='Replay pace (0 = the file\'s own FPS, 30 for image folders)')
+    args = parser.parse_args()
+    
     root = ctk.CTk()
-    app = VisionAssistantGUI(root, default_model_path=DEFAULT_MODEL)
+    app = VisionAssistantGUI(root, default_model_path=args.model,
+                             replay_realtime=args.replay == 'realtime', replay_fps=args.replay_fps or None)
+    if args.source:
+        root.after(500, lambda: app.start_replay(args.source))
     root.mainloop()
 
 if __name__ == "__main__":
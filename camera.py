@@ -0,0 +1,214 @@
+import os
+import glob
+import time
+import threading
+
+import cv2
+
+BACKEND_AUTO = "auto"
+CAPTURE_BACKENDS = {
+    BACKEND_AUTO: cv2.CAP_ANY,
+    "v4l2": cv2.CAP_V4L2,
+    "ffmpeg": cv2.CAP_FFMPEG,
+    "gstreamer": cv2.CAP_GSTREAMER,
+    "avfoundation": cv2.CAP_AVFOUNDATION,
+    "dshow": cv2.CAP_DSHOW,
+    "msmf": cv2.CAP_MSMF,
+}
+DEFAULT_BUFFER_SIZE = 1  # frames the driver may queue; 1 keeps latency lowest
+DEFAULT_FILE_FPS = 30.0  # replay rate for files that do not report one
+IMG_EXTS = ['.jpg', '.jpeg', '.png', '.bmp']
+
+
+class ImageFolderCapture:
+    """
+    cv2.VideoCapture look-alike over a folder of images (e.g. predict_v2),
+    read in name order as the frames of a video. Every frame is resized to
+    the first image's size, or to a size set with CAP_PROP_FRAME_WIDTH and
+    CAP_PROP_FRAME_HEIGHT, because trackers expect a fixed frame size.
+    """
+
+    def __init__(self, folder, fps=DEFAULT_FILE_FPS):
+        self.paths = sorted(f for f in glob.glob(f"{folder}/*") if os.path.splitext(f)[1].lower() in IMG_EXTS)
+        self.fps = fps
+        self.pos = 0
+        self.width = None
+        self.height = None
+
+    def isOpened(self):
+        return bool(self.paths)
+
+    def read(self):
+        while self.pos < len(self.paths):
+            frame = cv2.imread(self.paths[self.pos])
+            self.pos += 1
+            if frame is None:
+                continue
+            if self.width is None or self.height is None:
+                self.height, self.width = frame.shape[:2]
+            if frame.shape[:2] != (self.height, self.width):
+                frame = cv2.resize(frame, (self.width, self.height), interpolation=cv2.INTER_AREA)
+            return True, frame
+        return False, None
+
+    def get(self, prop):
+        return {
+            cv2.CAP_PROP_FPS: self.fps,
+            cv2.CAP_PROP_POS_FRAMES: self.pos,
+            cv2.CAP_PROP_FRAME_COUNT: len(self.paths),
+            cv2.CAP_PROP_FRAME_WIDTH: self.width or 0,
+            cv2.CAP_PROP_FRAME_HEIGHT: self.height or 0,
+        }.get(prop, 0)
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.pos = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+        else:
+            return False
+        return True
+
+    def release(self):
+        self.paths = []
+
+
+def open_capture(source, backend=BACKEND_AUTO):
+    """
+    cv2.VideoCapture for a camera index or a video file/stream path with
+    the named capture backend (see CAPTURE_BACKENDS). A folder opens as an
+    ImageFolderCapture.
+    """
+    if backend not in CAPTURE_BACKENDS:
+        raise ValueError(f"Unknown capture backend {backend!r}, expected one of {sorted(CAPTURE_BACKENDS)}")
+    if isinstance(source, str) and source.isdigit():
+        source = int(source)
+    if isinstance(source, str) and os.path.isdir(source):
+        return ImageFolderCapture(source)
+    return cv2.VideoCapture(source, CAPTURE_BACKENDS[backend])
+
+
+class FrameGrabber:
+    """
+    Reads a camera or video file on its own thread and keeps only the
+    newest frame, stamped with the wall-clock time it was read, so the
+    driver buffer never fills up and consumers always get a fresh frame.
+
+    Video files and image folders replay in real time by default (paced
+    by `fps` or the file's own rate, dropping frames a slow consumer
+    misses, like a camera would). With realtime=False every frame is
+    delivered as fast as the consumer takes them, which suits benchmarks.
+    Either way a replay needs no camera hardware.
+    """
+
+    def __init__(self, source, backend=BACKEND_AUTO, width=None, height=None,
+                 buffer_size=DEFAULT_BUFFER_SIZE, realtime=True, loop=False, fps=None):
+        self.source = source
+        self.cap = open_capture(source, backend)
+        if not self.cap.isOpened():
+            raise IOError(f"Cannot open video source {source!r}")
+
+        if width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+        if height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+        if buffer_size:
+            # not every backend supports this, in which case it is ignored
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, buffer_size)
+
+        self.is_file = isinstance(source, str) and not source.isdigit() and os.path.exists(source)
+        self.realtime = realtime
+        self.loop = loop
+        self.fps = fps or self.cap.get(cv2.CAP_PROP_FPS) or DEFAULT_FILE_FPS
+        self.frames = 0
+        self.dropped = 0
+
+        self._cond = threading.Condition()
+        self._frame = None
+        self._captured_at = 0.0
+        self._seq = 0
+        self._read_seq = 0
+        self._running = False
+        self._ended = False
+        self._thread = threading.Thread(target=self._run, name="frame-grabber", daemon=True)
+
+    def start(self):
+        self._running = True
+        self._thread.start()
+        return self
+
+    def isOpened(self):
+        return self._running and not self._ended
+
+    def read(self, timeout=1.0):
+        """Drop-in for cv2.VideoCapture.read(): (True, frame) or (False, None)."""
+        frame, _, _ = self.read_stamped(timeout)
+        return frame is not None, frame
+
+    def read_stamped(self, timeout=1.0):
+        """
+        The newest frame not returned before as (frame, captured_at, index),
+        waiting up to `timeout` seconds. (None, 0.0, index) when the source
+        ended or nothing arrived in time.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > self._read_seq or self._ended, timeout)
+            if self._seq == self._read_seq:
+                return None, 0.0, self._seq
+            self._read_seq = self._seq
+            self._cond.notify_all()
+            return self._frame, self._captured_at, self._seq
+
+    def release(self):
+        self._running = False
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread.is_alive():
+            self._thread.join(timeout=2.0)
+        self.cap.release()
+
+    def _run(self):
+        lossless = self.is_file and not self.realtime
+        started = time.perf_counter()
+        replayed = 0
+        while self._running:
+            if lossless:
+                # wait for the consumer instead of overwriting a frame it has not seen
+                with self._cond:
+                    self._cond.wait_for(lambda: self._read_seq == self._seq or not self._running, 0.5)
+                    if self._read_seq != self._seq:
+                        continue
+
+            ok, frame = self.cap.read()
+            captured_at = time.time()
+            if not ok or frame is None:
+                if self.is_file and self.loop and self.frames:
+                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    continue
+                if self.is_file:
+                    break
+                # cameras hiccup; keep trying
+                time.sleep(0.01)
+                continue
+
+            if self.is_file and self.realtime:
+                replayed += 1
+                delay = started + replayed / self.fps - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                captured_at = time.time()
+
+            with self._cond:
+                if self._seq > self._read_seq:
+                    self.dropped += 1
+                self._frame = frame
+                self._captured_at = captured_at
+                self._seq += 1
+                self.frames += 1
+                self._cond.notify_all()
+
+        with self._cond:
+            self._ended = True
+            self._cond.notify_all()
@@ -0,0 +1,58 @@
+import os
+import sqlite3
+import threading
+
+CACHE_SIZE_KB = 8 * 1024  # page cache per connection
+MMAP_SIZE = 64 * 1024 * 1024
+STATEMENT_CACHE = 256  # prepared statements kept per connection
+BUSY_TIMEOUT = 5.0  # seconds a writer waits for another thread's lock
+
+
+class ConnectionPool:
+    """
+    One long-lived SQLite connection per thread for a database file. The
+    file is switched to WAL once, so readers (the vision thread verifying
+    a medicine) never block on the GUI saving one and vice versa. Each
+    connection keeps its page cache and prepared statements between calls
+    instead of reopening the file for every query.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+        conn = self.connection()
+        conn.execute("PRAGMA journal_mode = WAL")
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=BUSY_TIMEOUT,
+                                   cached_statements=STATEMENT_CACHE)
+            # WAL is durable across application crashes with NORMAL syncing
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+            conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+            conn.execute("PRAGMA temp_store = MEMORY")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        """Closes the calling thread's connection."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.conn = None
+            conn.close()
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path):
+    """The shared pool of a database file; every user of the file gets the same one."""
+    key = os.path.abspath(path)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(path)
+        return _pools[key]
@@ -13,6 +13,7 @@ function App() {
   const [voiceEnabled, setVoiceEnabled] = useState(false);
 
   const { sendCommand, lastMessage } = useWebSocket("ws://localhost:8000/ws", {
+    binary: true,
     onOpen: () => {
       console.log("WebSocket connected");
       setIsConnected(true);
@@ -32,8 +33,8 @@ function App() {
     if (!lastMessage) return;
 
     try {
-      const data = JSON.parse(lastMessage);
-      console.log("Incoming frameData:", data);
+      // the hook hands over decoded messages, binary and JSON alike
+      const data = lastMessage;
 
       if (data.type === "frame") {
         setFrameData(data);
@@ -70,13 +70,15 @@ function VideoDisplay({ frameData }) {
   const imgRef = useRef(null);
 
   useEffect(() => {
-    if (!frameData?.image) return;
+    if (!frameData?.image && !frameData?.jpeg) return;
 
     const canvas = canvasRef.current;
     const ctx = canvas.getContext("2d");
     const img = imgRef.current;
 
-    img.src = `data:image/jpeg;base64,${frameData.image}`;
+    // binary protocol hands us a JPEG Blob, JSON protocol a base64 string
+    const objectUrl = frameData.jpeg ? URL.createObjectURL(frameData.jpeg) : null;
+    img.src = objectUrl || `data:image/jpeg;base64,${frameData.image}`;
 
     img.onload = () => {
       const dpr = window.devicePixelRatio || 1;
@@ -98,6 +100,12 @@ function VideoDisplay({ frameData }) {
         drawActiveBox(ctx, frameData.active_bbox);
       }
     };
+
+    // runs when the next frame replaces this one, loaded or not
+    return () => {
+      img.onload = null;
+      if (objectUrl) URL.revokeObjectURL(objectUrl);
+    };
   }, [frameData]);
 
   return (
@@ -1,5 +1,60 @@
 import { useEffect, useRef, useState, useCallback } from 'react';
 
+// Binary frame layout, mirrors Backend/protocol.py (little-endian):
+//   header    magic "ARSF", version u8, mode u8, detection count u16, captured_at f64
+//   detection class_id u16, confidence f32, xmin/ymin/xmax/ymax u16
+//   remainder raw JPEG bytes
+const BINARY_MAGIC = 'ARSF';
+const BINARY_VERSION = 1;
+const HEADER_SIZE = 16;
+const DETECTION_SIZE = 14;
+const MODES = ['SCAN', 'GUIDE'];
+
+export const decodeBinaryFrame = (buffer, labels = {}) => {
+    const view = new DataView(buffer);
+    const magic = String.fromCharCode(
+        view.getUint8(0), view.getUint8(1), view.getUint8(2), view.getUint8(3)
+    );
+    if (magic !== BINARY_MAGIC || view.getUint8(4) !== BINARY_VERSION) {
+        throw new Error('Unknown binary frame format');
+    }
+
+    const mode = MODES[view.getUint8(5)] || 'SCAN';
+    const count = view.getUint16(6, true);
+    const capturedAt = view.getFloat64(8, true);
+
+    const detections = [];
+    let offset = HEADER_SIZE;
+    for (let i = 0; i < count; i++) {
+        const classId = view.getUint16(offset, true);
+        detections.push({
+            class_id: classId,
+            class: labels[classId] ?? String(classId),
+            confidence: view.getFloat32(offset + 2, true),
+            bbox: [
+                view.getUint16(offset + 6, true),
+                view.getUint16(offset + 8, true),
+                view.getUint16(offset + 10, true),
+                view.getUint16(offset + 12, true),
+            ],
+        });
+        offset += DETECTION_SIZE;
+    }
+
+    return {
+        type: 'frame',
+        mode,
+        captured_at: capturedAt,
+        detections,
+        jpeg: new Blob([buffer.slice(offset)], { type: 'image/jpeg' }),
+    };
+};
+
+const withProtocol = (url, binary) => {
+    if (!binary) return url;
+    return `${url}${url.includes('?') ? '&' : '?'}protocol=binary`;
+};
+
 const useWebSocket = (url, options = {}) => {
     const [lastMessage, setLastMessage] = useState(null);
     const [readyState, setReadyState] = useState(WebSocket.CLOSED);
@@ -9,12 +64,14 @@ const useWebSocket = (url, options = {}) => {
     const shouldReconnect = useRef(true);
     const isConnecting = useRef(false);
     const hasMountedOnce = useRef(false);
+    const labels = useRef({});
 
     const {
         onOpen,
         onClose,
         onError,
         reconnectInterval = 5000,
+        binary = false,
     } = options;
 
     const connect = useCallback(() => {
@@ -24,7 +81,8 @@ const useWebSocket = (url, options = {}) => {
         console.log('Connecting to:', url);
 
         try {
-            const socket = new WebSocket(url);
+            const socket = new WebSocket(withProtocol(url, binary));
+            socket.binaryType = 'arraybuffer';
             ws.current = socket;
 
             socket.onopen = (event) => {
@@ -40,7 +98,28 @@ const useWebSocket = (url, options = {}) => {
             };
 
             socket.onmessage = (event) => {
-                setLastMessage(event.data);
+                if (event.data instanceof ArrayBuffer) {
+                    try {
+                        setLastMessage(decodeBinaryFrame(event.data, labels.current));
+                    } catch (err) {
+                        console.error('Bad binary frame', err);
+                    }
+                    return;
+                }
+
+                // text messages are parsed here once; consumers get objects
+                let message;
+                try {
+                    message = JSON.parse(event.data);
+                } catch (err) {
+                    console.error('Bad text message', err);
+                    return;
+                }
+
+                if (message.type === 'hello') {
+                    labels.current = message.labels || {};
+                }
+                setLastMessage(message);
             };
 
             socket.onerror = (event) => {
@@ -64,7 +143,7 @@ const useWebSocket = (url, options = {}) => {
             console.error('WebSocket creation failed', err);
             isConnecting.current = false;
         }
-    }, [url, onOpen, onClose, onError, reconnectInterval]);
+    }, [url, binary, onOpen, onClose, onError, reconnectInterval]);
 
     useEffect(() => {
         if (!hasMountedOnce.current) {
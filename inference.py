@@ -0,0 +1,347 @@
+import os
+import ast
+import argparse
+
+import cv2
+import numpy as np
+
+# Ultralytics predict() defaults, kept so every backend returns the same boxes
+DEFAULT_CONF = 0.25
+DEFAULT_IOU = 0.7
+MAX_DET = 300
+MAX_NMS = 30000
+MAX_WH = 7680
+LETTERBOX_COLOR = (114, 114, 114)
+
+BACKEND_AUTO = "auto"
+BACKEND_ULTRALYTICS = "ultralytics"
+BACKEND_ONNX = "onnx"
+BACKEND_OPENVINO = "openvino"
+
+
+# Compact per-frame detection record shared by every consumer (GUI, backend,
+# yolo_detect). bbox is in integer pixels, area and cx are precomputed for
+# the SELECT/guidance/position logic. track_id is -1 until tracker.py fills it.
+DETECTION_DTYPE = np.dtype([
+    ("bbox", np.int32, (4,)),
+    ("conf", np.float32),
+    ("class_id", np.int32),
+    ("area", np.int32),
+    ("cx", np.float32),
+    ("track_id", np.int32),
+])
+
+
+class Detections:
+    """
+    Detections for one frame as contiguous NumPy arrays in original image
+    pixels: xyxy (N, 4) float32, conf (N,) float32, cls (N,) int32.
+    """
+
+    __slots__ = ("xyxy", "conf", "cls")
+
+    def __init__(self, xyxy, conf, cls):
+        self.xyxy = np.ascontiguousarray(xyxy, dtype=np.float32).reshape(-1, 4)
+        self.conf = np.ascontiguousarray(conf, dtype=np.float32).reshape(-1)
+        self.cls = np.ascontiguousarray(cls, dtype=np.int32).reshape(-1)
+
+    def __len__(self):
+        return len(self.conf)
+
+    def records(self, conf_thresh=0.0):
+        """Detections with conf >= conf_thresh as a DETECTION_DTYPE array."""
+        mask = self.conf >= conf_thresh
+        bbox = self.xyxy[mask].astype(np.int32)
+
+        records = np.empty(len(bbox), dtype=DETECTION_DTYPE)
+        records["bbox"] = bbox
+        records["conf"] = self.conf[mask]
+        records["class_id"] = self.cls[mask]
+        records["area"] = (bbox[:, 2] - bbox[:, 0]) * (bbox[:, 3] - bbox[:, 1])
+        records["cx"] = (bbox[:, 0] + bbox[:, 2]) / 2
+        records["track_id"] = -1
+        return records
+
+
+class Detector:
+    """Common interface of every inference backend."""
+
+    backend = None
+
+    def __init__(self, model_path):
+        self.model_path = model_path
+        self.names = {}
+
+    def detect(self, frame):
+        raise NotImplementedError
+
+    def __call__(self, frame):
+        return self.detect(frame)
+
+
+class UltralyticsDetector(Detector):
+    """PyTorch eager inference through ultralytics, the original behaviour."""
+
+    backend = BACKEND_ULTRALYTICS
+
+    def __init__(self, model_path, conf=DEFAULT_CONF):
+        super().__init__(model_path)
+        from ultralytics import YOLO
+        self.model = YOLO(model_path)
+        self.names = self.model.names
+        self.conf = conf
+
+    def detect(self, frame):
+        # one device-to-host copy; rows are xyxy, [track id,] conf, cls
+        data = self.model(frame, verbose=False, conf=self.conf)[0].boxes.data.cpu().numpy()
+        return Detections(data[:, :4], data[:, -2], data[:, -1])
+
+
+def letterbox(frame, new_shape, stride=32, auto=False):
+    """
+    Same resize and padding as ultralytics LetterBox. With `auto` the padding
+    is only up to the next stride multiple, which is what the PyTorch path
+    uses; fixed-shape exported models need the full `new_shape` canvas.
+    Returns the padded image, the scale ratio and the (left, top) padding.
+    """
+    h, w = frame.shape[:2]
+    new_h, new_w = new_shape
+    r = min(new_h / h, new_w / w)
+
+    unpad_w, unpad_h = int(round(w * r)), int(round(h * r))
+    dw, dh = new_w - unpad_w, new_h - unpad_h
+    if auto:
+        dw, dh = dw % stride, dh % stride
+    dw /= 2
+    dh /= 2
+
+    if (w, h) != (unpad_w, unpad_h):
+        frame = cv2.resize(frame, (unpad_w, unpad_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(dh - 0.1)), int(round(dh + 0.1))
+    left, right = int(round(dw - 0.1)), int(round(dw + 0.1))
+    frame = cv2.copyMakeBorder(frame, top, bottom, left, right, cv2.BORDER_CONSTANT, value=LETTERBOX_COLOR)
+    return frame, r, (left, top)
+
+
+def box_iou(a, b):
+    # (N, 4) x (M, 4) xyxy boxes -> (N, M) IoU, shared by the tracker and quantize.py
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(rb - lt, 0, None).prod(axis=2)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def nms(boxes, scores, iou_thresh):
+    # greedy NMS with the same IoU definition as torchvision.ops.nms
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = (x2 - x1) * (y2 - y1)
+    order = scores.argsort()[::-1]
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        xx1 = np.maximum(x1[i], x1[order[1:]])
+        yy1 = np.maximum(y1[i], y1[order[1:]])
+        xx2 = np.minimum(x2[i], x2[order[1:]])
+        yy2 = np.minimum(y2[i], y2[order[1:]])
+        inter = np.clip(xx2 - xx1, 0, None) * np.clip(yy2 - yy1, 0, None)
+        iou = inter / (areas[i] + areas[order[1:]] - inter + 1e-9)
+        order = order[1:][iou <= iou_thresh]
+    return np.array(keep, dtype=np.int64)
+
+
+class ExportedYoloDetector(Detector):
+    """
+    Shared pre/post-processing for YOLOv8 graphs exported by ultralytics,
+    whose single output is (1, 4 + num_classes, anchors) with xywh boxes.
+    """
+
+    def __init__(self, model_path, conf=DEFAULT_CONF, iou=DEFAULT_IOU):
+        super().__init__(model_path)
+        self.conf = conf
+        self.iou = iou
+        self.imgsz = (640, 640)
+        self.dynamic = False
+        self.stride = 32
+
+    def preprocess(self, frame):
+        img, ratio, pad = letterbox(frame, self.imgsz, self.stride, auto=self.dynamic)
+        blob = cv2.dnn.blobFromImage(img, scalefactor=1 / 255.0, swapRB=True)
+        return blob, ratio, pad
+
+    def postprocess(self, output, ratio, pad, orig_shape):
+        preds = output[0].T  # (anchors, 4 + nc)
+        scores = preds[:, 4:]
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), cls]
+
+        mask = conf > self.conf
+        if not mask.any():
+            return Detections(np.empty((0, 4)), [], [])
+        preds, cls, conf = preds[mask], cls[mask], conf[mask]
+
+        xy, wh = preds[:, :2], preds[:, 2:4]
+        boxes = np.concatenate((xy - wh / 2, xy + wh / 2), axis=1)
+
+        order = conf.argsort()[::-1][:MAX_NMS]
+        boxes, cls, conf = boxes[order], cls[order], conf[order]
+
+        # offset boxes by class so NMS never suppresses across classes
+        keep = nms(boxes + cls[:, None] * MAX_WH, conf, self.iou)[:MAX_DET]
+        boxes, cls, conf = boxes[keep], cls[keep], conf[keep]
+
+        boxes[:, [0, 2]] -= pad[0]
+        boxes[:, [1, 3]] -= pad[1]
+        boxes /= ratio
+        h, w = orig_shape[:2]
+        boxes[:, [0, 2]] = boxes[:, [0, 2]].clip(0, w)
+        boxes[:, [1, 3]] = boxes[:, [1, 3]].clip(0, h)
+        return Detections(boxes, conf, cls)
+
+    def infer(self, blob):
+        raise NotImplementedError
+
+    def detect(self, frame):
+        blob, ratio, pad = self.preprocess(frame)
+        return self.postprocess(self.infer(blob), ratio, pad, frame.shape)
+
+
+def _parse_names(raw):
+    if isinstance(raw, dict):
+        return {int(k): v for k, v in raw.items()}
+    return {int(k): v for k, v in ast.literal_eval(raw).items()}
+
+
+class OnnxDetector(ExportedYoloDetector):
+    """ONNX Runtime on the CPU execution provider with IO binding."""
+
+    backend = BACKEND_ONNX
+
+    def __init__(self, model_path, threads=0, **kwargs):
+        super().__init__(model_path, **kwargs)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.output_name = self.session.get_outputs()[0].name
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "names" in metadata:
+            self.names = _parse_names(metadata["names"])
+        if "stride" in metadata:
+            self.stride = int(metadata["stride"])
+
+        height, width = model_input.shape[2:]
+        if isinstance(height, int) and isinstance(width, int):
+            self.imgsz = (height, width)
+        else:
+            self.dynamic = True
+            if "imgsz" in metadata:
+                self.imgsz = tuple(ast.literal_eval(metadata["imgsz"]))
+
+        self.binding = self.session.io_binding()
+
+    def infer(self, blob):
+        self.binding.bind_cpu_input(self.input_name, blob)
+        self.binding.bind_output(self.output_name)
+        self.session.run_with_iobinding(self.binding)
+        return self.binding.copy_outputs_to_cpu()[0]
+
+
+class OpenVinoDetector(ExportedYoloDetector):
+    """OpenVINO CPU plugin compiled for latency."""
+
+    backend = BACKEND_OPENVINO
+
+    def __init__(self, model_path, threads=0, **kwargs):
+        super().__init__(model_path, **kwargs)
+        import openvino as ov
+
+        xml_path = model_path
+        if os.path.isdir(model_path):
+            xml_path = next(os.path.join(model_path, f) for f in sorted(os.listdir(model_path)) if f.endswith(".xml"))
+
+        metadata_path = os.path.join(os.path.dirname(xml_path), "metadata.yaml")
+        if os.path.exists(metadata_path):
+            import yaml
+            with open(metadata_path) as f:
+                metadata = yaml.safe_load(f)
+            self.names = _parse_names(metadata.get("names", {}))
+            self.stride = int(metadata.get("stride", self.stride))
+            if "imgsz" in metadata:
+                self.imgsz = tuple(metadata["imgsz"])
+
+        core = ov.Core()
+        model = core.read_model(xml_path)
+        shape = model.input(0).get_partial_shape()
+        self.dynamic = shape.is_dynamic
+        if not self.dynamic:
+            self.imgsz = (shape[2].get_length(), shape[3].get_length())
+
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if threads:
+            config["INFERENCE_NUM_THREADS"] = threads
+        self.compiled = core.compile_model(model, "CPU", config)
+        self.request = self.compiled.create_infer_request()
+
+    def infer(self, blob):
+        self.request.infer({0: blob})
+        return self.request.get_output_tensor(0).data
+
+
+def resolve_backend(model_path, backend=BACKEND_AUTO):
+    if backend != BACKEND_AUTO:
+        return backend
+    if model_path.endswith(".onnx"):
+        return BACKEND_ONNX
+    if model_path.endswith(".xml") or os.path.isdir(model_path):
+        return BACKEND_OPENVINO
+    return BACKEND_ULTRALYTICS
+
+
+def load_detector(model_path, backend=BACKEND_AUTO, threads=0):
+    """
+    Loads `model_path` with the requested backend. "auto" picks by file type:
+    .onnx -> ONNX Runtime, OpenVINO .xml or export directory -> OpenVINO,
+    anything else (.pt) -> ultralytics.
+    """
+    backend = resolve_backend(model_path, backend)
+    if backend == BACKEND_ONNX:
+        return OnnxDetector(model_path, threads=threads)
+    if backend == BACKEND_OPENVINO:
+        return OpenVinoDetector(model_path, threads=threads)
+    if backend == BACKEND_ULTRALYTICS:
+        return UltralyticsDetector(model_path)
+    raise ValueError(f"Unknown inference backend: {backend}")
+
+
+def export_model(model_path, fmt, imgsz=640, dynamic=False):
+    from ultralytics import YOLO
+    return YOLO(model_path).export(format=fmt, imgsz=imgsz, dynamic=dynamic)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the YOLO model for a CPU inference backend")
+    parser.add_argument('--model', required=True, help='Path to the PyTorch model (e.g., my_model_v2.pt)')
+    parser.add_argument('--format', choices=[BACKEND_ONNX, BACKEND_OPENVINO], default=BACKEND_ONNX, help='Export format')
+    parser.add_argument('--imgsz', type=int, default=640, help='Export input size')
+    parser.add_argument('--dynamic', action='store_true', help='Dynamic input shape (matches PyTorch letterboxing exactly)')
+    args = parser.parse_args()
+
+    exported = export_model(args.model, args.format, args.imgsz, args.dynamic)
+    print(f"Exported: {exported}")
+
+
+if __name__ == "__main__":
+    main()
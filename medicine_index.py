@@ -0,0 +1,175 @@
+import re
+import threading
+from difflib import SequenceMatcher
+
+import numpy as np
+
+CANDIDATES = 12  # medicines reranked with the exact similarity per query
+MIN_SCORE = 0.4
+
+_non_alnum = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text):
+    return _non_alnum.sub(" ", text.lower()).strip()
+
+
+def trigrams(text):
+    padded = f"  {normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def match_score(ocr_lower, name, ingredients):
+    """Similarity of OCR text to one medicine: name, ingredients or containment, whichever is best."""
+    name_lower = name.lower()
+    name_score = SequenceMatcher(None, ocr_lower, name_lower).ratio()
+
+    ingredient_score = 0
+    if ingredients:
+        ingredient_score = SequenceMatcher(None, ocr_lower, ingredients.lower()).ratio()
+
+    contains_score = 0
+    if name_lower in ocr_lower or ocr_lower in name_lower:
+        contains_score = 0.8
+    if ingredients and (ingredients.lower() in ocr_lower or ocr_lower in ingredients.lower()):
+        contains_score = max(contains_score, 0.8)
+
+    return max(name_score, ingredient_score, contains_score)
+
+
+class MedicineIndex:
+    """
+    Trigram postings over medicine names and active ingredients. A query
+    counts shared trigrams for every entry at once with np.bincount, keeps
+    the best CANDIDATES medicines and only reranks those with the exact
+    SequenceMatcher score, so matching cost no longer grows with the size
+    of the formulary. Rows are the `SELECT * FROM medicines` tuples.
+    """
+
+    def __init__(self, rows=()):
+        self._lock = threading.Lock()
+        self.rows = {}  # medicine id -> row
+        self._entries = {}  # medicine id -> entry numbers
+        self._postings = {}  # trigram -> entry numbers
+        self._entry_medicine = []
+        self._entry_size = []
+        self._entry_alive = []
+        self._arrays = None
+        self._dead = 0
+        for row in rows:
+            self._add(row)
+
+    def __len__(self):
+        return len(self.rows)
+
+    def add(self, row):
+        """Adds a medicine or replaces the indexed version of it."""
+        with self._lock:
+            self._remove(row[0])
+            self._add(row)
+            if self._dead > len(self._entry_alive) // 2:
+                self._rebuild()
+
+    def remove(self, medicine_id):
+        with self._lock:
+            self._remove(medicine_id)
+
+    def search(self, text, limit=CANDIDATES):
+        """Best matching rows for OCR text as (row, score), highest score first."""
+        ocr_lower = text.lower()
+        query = trigrams(text)
+        with self._lock:
+            entry_medicine, entry_size, entry_alive = self._entry_arrays()
+            postings = [self._postings[t] for t in query if t in self._postings]
+            if not postings:
+                return []
+
+            counts = np.bincount(np.concatenate(postings), minlength=len(entry_medicine))
+            hits = np.flatnonzero((counts > 0) & entry_alive)
+            shared = counts[hits]
+            # fraction of the entry found in the text, or of the text found in the entry
+            overlap = np.maximum(shared / entry_size[hits], shared / len(query))
+
+            candidates = []
+            for i in hits[np.argsort(-overlap, kind="stable")]:
+                medicine_id = int(entry_medicine[i])
+                if medicine_id not in candidates:
+                    candidates.append(medicine_id)
+                    if len(candidates) == limit:
+                        break
+            rows = [self.rows[medicine_id] for medicine_id in candidates]
+
+        scored = [(row, match_score(ocr_lower, row[1], row[6])) for row in rows]
+        scored.sort(key=lambda r: r[1], reverse=True)
+        return scored
+
+    def best_match(self, text, min_score=MIN_SCORE, extra_rows=()):
+        """
+        The best (row, score) for OCR text, or (None, 0) below min_score.
+        `extra_rows` are further candidates, e.g. full-text search hits,
+        scored the same way.
+        """
+        results = self.search(text)
+        seen = {row[0] for row, _ in results}
+        ocr_lower = text.lower()
+        for row in extra_rows:
+            if row[0] not in seen:
+                seen.add(row[0])
+                results.append((row, match_score(ocr_lower, row[1], row[6])))
+        results.sort(key=lambda r: r[1], reverse=True)
+        if results and results[0][1] > min_score:
+            return results[0]
+        return None, 0
+
+    def _add(self, row):
+        medicine_id, name, ingredients = row[0], row[1], row[6]
+        self.rows[medicine_id] = row
+        numbers = []
+        for field in (name, ingredients):
+            grams = trigrams(field) if field else set()
+            if not grams:
+                continue
+            number = len(self._entry_medicine)
+            self._entry_medicine.append(medicine_id)
+            self._entry_size.append(len(grams))
+            self._entry_alive.append(True)
+            for gram in grams:
+                posting = self._postings.get(gram)
+                if posting is None:
+                    self._postings[gram] = [number]
+                elif isinstance(posting, list):
+                    posting.append(number)
+                else:
+                    self._postings[gram] = posting.tolist() + [number]
+            numbers.append(number)
+        self._entries[medicine_id] = numbers
+        self._arrays = None
+
+    def _remove(self, medicine_id):
+        if self.rows.pop(medicine_id, None) is None:
+            return
+        for number in self._entries.pop(medicine_id, []):
+            self._entry_alive[number] = False
+            self._dead += 1
+        self._arrays = None
+
+    def _rebuild(self):
+        rows = list(self.rows.values())
+        self.rows, self._entries, self._postings = {}, {}, {}
+        self._entry_medicine, self._entry_size, self._entry_alive = [], [], []
+        self._dead = 0
+        for row in rows:
+            self._add(row)
+
+    def _entry_arrays(self):
+        # posting lists stay Python lists so adds are cheap; numpy views are
+        # rebuilt on the first query after a change
+        if self._arrays is None:
+            self._postings = {t: np.asarray(p, dtype=np.int32) if isinstance(p, list) else p
+                              for t, p in self._postings.items()}
+            self._arrays = (
+                np.asarray(self._entry_medicine, dtype=np.int64),
+                np.asarray(self._entry_size, dtype=np.float32),
+                np.asarray(self._entry_alive, dtype=bool),
+            )
+        return self._arrays
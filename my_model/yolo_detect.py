@@ -7,14 +7,24 @@ import pyttsx3
 
 import cv2
 import numpy as np
-from ultralytics import YOLO
 
 import threading
 import speech_recognition as sr
 
-import pytesseract
 
 import queue
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from inference import load_detector, BACKEND_AUTO, BACKEND_ULTRALYTICS, BACKEND_ONNX, BACKEND_OPENVINO
+from camera import FrameGrabber, CAPTURE_BACKENDS
+from scheduler import AdaptiveDetector, DEFAULT_TARGET_FPS, DEFAULT_MAX_INTERVAL
+from tracker import IoUTracker
+from ocr_engine import get_engine, ENGINE_AUTO, ENGINE_TESSEROCR, ENGINE_PYTESSERACT
+from text_regions import read_text
+from ocr_service import OCRService, DEFAULT_FRESH_AGE
+from ocr_fusion import fuse_texts
 
 CMD_SCAN   = "SCAN"
 CMD_GUIDE  = "GUIDE"
@@ -71,13 +81,12 @@ def command_allowed():
 
 # text to speech engine initialization
 engine = pyttsx3.init()
-spoken_objects_global = set() 
+spoken_objects_global = set()  # track IDs already announced
 last_speak_time = 0 
-detection_start_time = {}      # to track when each object first appeared
-CONFIRMATION_TIME = 1.0   
+CONFIRMATION_TIME = 1.0   # seconds a track must exist before it is announced
 
 Frame_Guidance_Cooldown = 1.5   # second between guidance for same obj
-last_guidance_time = {}
+last_guidance_time = {}   # track ID -> last guidance time
 
 STATE_SCAN = 0     
 STATE_GUIDE = 1        
@@ -145,12 +154,30 @@ def listen_for_commands():
 
 
 
+ocr_engine = ENGINE_AUTO  # set from --ocr-engine
+text_lines = False  # set from --text-lines
+
+def ocr_gray(gray):
+    if text_lines:
+        return read_text(gray, ocr_preprocessed)
+    return ocr_preprocessed(gray)
+
 def do_ocr_on_object(frame, bbox):
     xmin, ymin, xmax, ymax = bbox
     crop_img = frame[ymin:ymax, xmin:xmax]
     # Converting  to grayscale
     gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
-    
+    return ocr_gray(gray)[0]
+
+def do_ocr_on_cropped_image(crop_img):
+    return ocr_cropped_image_with_confidence(crop_img)[0]
+
+def ocr_cropped_image_with_confidence(crop_img):
+    # Converting to grayscale
+    gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
+    return ocr_gray(gray)
+
+def ocr_preprocessed(gray):
     # Apply preprocessing for better OCR
     gray = cv2.equalizeHist(gray) #increase contrast
     
@@ -158,39 +185,40 @@ def do_ocr_on_object(frame, bbox):
     
     _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU) #thresholding 
     
-    text = pytesseract.image_to_string(thresh, config='--psm 6')
+    text, conf = get_engine(ocr_engine).read_with_confidence(thresh, psm=6)
     
     #fallback to original greyscale
-    if not text.strip():
-        text = pytesseract.image_to_string(gray, config='--psm 6')
+    if not text:
+        text, conf = get_engine(ocr_engine).read_with_confidence(gray, psm=6)
     
-    return text.strip()
+    return text, conf
 
-def do_ocr_on_cropped_image(crop_img):
-    # Converting to grayscale
-    gray = cv2.cvtColor(crop_img, cv2.COLOR_BGR2GRAY)
-    
-    gray = cv2.equalizeHist(gray)
-    gray = cv2.fastNlMeansDenoising(gray, h=10)
-    _, thresh = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
-    
-    text = pytesseract.image_to_string(thresh, config='--psm 6')
-    
-    # Fallback to original
-    if not text.strip():
-        text = pytesseract.image_to_string(gray, config='--psm 6')
-    
-    return text.strip()
+READ_FRAMES = 5  # recent crops of the selected object fused by READ
 
 def main():
     parser = argparse.ArgumentParser(description="YOLOv8 Detection")
-    parser.add_argument('--model', required=True, help='Path to YOLO model file (e.g., best.pt)')
+    parser.add_argument('--model', required=True, help='Path to YOLO model file (e.g., best.pt, best.onnx or an OpenVINO export folder)')
+    parser.add_argument('--backend', default=BACKEND_AUTO, choices=[BACKEND_AUTO, BACKEND_ULTRALYTICS, BACKEND_ONNX, BACKEND_OPENVINO], help='Inference backend (auto picks by model file type)')
+    parser.add_argument('--threads', type=int, default=0, help='CPU threads for onnx/openvino backends (0 = runtime default)')
     parser.add_argument('--source', required=True, help='Image, folder, video file, or webcam index (0)')
     parser.add_argument('--thresh', type=float, default=0.5, help='Confidence threshold (0-1)')
     parser.add_argument('--resolution', default=None, help='WxH display resolution, e.g., 640x480')
+    parser.add_argument('--target-fps', type=float, default=DEFAULT_TARGET_FPS, help='Video/camera rate to hold by tracking boxes between YOLO runs (0 = YOLO on every frame)')
+    parser.add_argument('--max-interval', type=int, default=DEFAULT_MAX_INTERVAL, help='Run YOLO at least every this many frames')
+    parser.add_argument('--ocr-engine', default=ENGINE_AUTO, choices=[ENGINE_AUTO, ENGINE_TESSEROCR, ENGINE_PYTESSERACT], help='OCR binding (auto prefers in-process tesserocr)')
+    parser.add_argument('--text-lines', action='store_true', help='OCR only the detected text lines of a crop (experimental, see text_regions.py)')
+    parser.add_argument('--capture-backend', default='auto', choices=sorted(CAPTURE_BACKENDS), help='OpenCV capture backend for video/camera sources')
+    parser.add_argument('--replay', default='fast', choices=['fast', 'realtime'], help='Video files: every frame as fast as possible, or paced at the file FPS dropping late frames')
+    parser.add_argument('--replay-fps', type=float, default=0, help='Pace for --replay realtime (0 = the file\'s own FPS, 30 for image folders)')
+    parser.add_argument('--stream', action='store_true', help='Play an image folder as consecutive video frames instead of separate stills')
+    parser.add_argument('--no-display', action='store_true', help='Do not open a window (headless benchmarks)')
     parser.add_argument('--record', action='store_true', help='Record video output (requires --resolution)')
     args = parser.parse_args()
 
+    global ocr_engine, text_lines
+    ocr_engine = args.ocr_engine
+    text_lines = args.text_lines
+
     model_path = args.model
     source = args.source
     conf_thresh = args.thresh
@@ -203,8 +231,9 @@ def main():
         sys.exit(1)
 
     # Load YOLO model
-    model = YOLO(model_path)
+    model = load_detector(model_path, args.backend, args.threads)
     labels = model.names
+    tracker = IoUTracker()
 
     # Parse resolution
     resize = False
@@ -216,7 +245,10 @@ def main():
     img_exts = ['.jpg','.jpeg','.png','.bmp']
     vid_exts = ['.mp4','.avi','.mov','.mkv']
 
-    if os.path.isdir(source):
+    if os.path.isdir(source) and args.stream:
+        # replayed like a camera, e.g. predict_v2 for hardware-free benchmarks
+        source_type = 'video'
+    elif os.path.isdir(source):
         source_type = 'folder'
         imgs_list = [f for f in glob.glob(f"{source}/*") if os.path.splitext(f)[1].lower() in img_exts]
     elif os.path.isfile(source):
@@ -238,22 +270,28 @@ def main():
 
     # Setup video/camera capture
     if source_type in ['video', 'usb']:
-        cap = cv2.VideoCapture(cam_idx if source_type=='usb' else source)
-        if resize:
-            cap.set(3, resW)
-            cap.set(4, resH)
+        # frames are grabbed on a background thread that keeps only the newest one
+        cap = FrameGrabber(cam_idx if source_type=='usb' else source, args.capture_backend,
+                           resW if resize else None, resH if resize else None,
+                           realtime=args.replay == 'realtime', fps=args.replay_fps or None).start()
         if record:
             if not resize:
                 print("Must specify --resolution to record.")
                 sys.exit(1)
             recorder = cv2.VideoWriter('demo1.avi', cv2.VideoWriter_fourcc(*'MJPG'), 30, (resW,resH))
 
+    # Stills are unrelated to each other, so only streams skip YOLO between frames
+    detector = model
+    if source_type in ['video', 'usb']:
+        detector = AdaptiveDetector(model, args.target_fps, args.max_interval)
+
     bbox_colors = [(164,120,87), (68,148,228), (93,97,209), (178,182,133),
                    (88,159,106), (96,202,231), (159,124,168), (169,162,241),
                    (98,118,150), (172,176,184)]
 
     fps_buffer = []
     fps_avg_len = 200
+    latency_buffer = deque(maxlen=fps_avg_len)  # capture to display, video/camera only
     img_count = 0
 
     global last_speak_time, spoken_objects_global, current_state, voice_command, voice_command_lock
@@ -264,6 +302,13 @@ def main():
 
     active_object = None
     active_object_bbox = None
+    active_track_id = None
+
+    # GUIDE mode overlay and READ are served from background OCR
+    ocr_service = OCRService(do_ocr_on_cropped_image)
+    ocr_service.start()
+    recent_crops = deque(maxlen=READ_FRAMES)  # (track ID, crop) from the live loop
+    read_pool = ThreadPoolExecutor(max_workers=READ_FRAMES)
 
     while True:
         t_start = time.perf_counter()
@@ -276,8 +321,10 @@ def main():
             frame = cv2.imread(imgs_list[img_count])
             img_count += 1
         elif source_type in ['video','usb']:
-            ret, frame = cap.read()
-            if not ret:
+            frame, captured_at, _ = cap.read_stamped()
+            if frame is None:
+                if cap.isOpened():
+                    continue
                 print("Video/camera ended or failed.")
                 break
 
@@ -290,86 +337,61 @@ def main():
         right_zone = 2 * frame_width / 3
 
         # YOLO inference
-        results = model(frame, verbose=False)
-        detections = results[0].boxes
-        obj_count = 0
+        current_time = time.time()
+        detections = tracker.update(detector.detect(frame).records(conf_thresh), current_time)
+        obj_count = len(detections)
+
+        # Keep the selected object locked to its track
+        active_track = tracker.visible(active_track_id)
+        if active_track is not None:
+            active_object_bbox = active_track.bbox
+            if current_state == STATE_GUIDE:
+                # Crop before anything is drawn on the frame
+                ocr_service.submit(active_track_id, frame, active_object_bbox)
+                xmin, ymin, xmax, ymax = active_object_bbox
+                crop = frame[max(0, ymin):ymax, max(0, xmin):xmax]
+                if crop.size:
+                    recent_crops.append((active_track_id, crop.copy()))
 
         # Draw detections
-        for det in detections:
-            xyxy = det.xyxy.cpu().numpy().squeeze().astype(int)
-            xmin, ymin, xmax, ymax = xyxy
-            class_idx = int(det.cls.item())
-            conf = det.conf.item()
-            if conf < conf_thresh:
-                continue
+        for (xmin, ymin, xmax, ymax), conf, class_idx in zip(
+                detections['bbox'].tolist(), detections['conf'].tolist(), detections['class_id'].tolist()):
             color = bbox_colors[class_idx % 10]
             classname = labels[class_idx]
             cv2.rectangle(frame, (xmin,ymin), (xmax,ymax), color, 2)
             label = f'{classname}: {conf:.2f}'
             cv2.putText(frame, label, (xmin, ymin-5), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0,0,0), 1)
-            obj_count += 1
-
-        # Announce detected object
-        current_frame_objects = set()
-        for det in detections:
-            classname = labels[int(det.cls.item())]
-            current_frame_objects.add(classname)
-
-        current_time = time.time()
-
-        # Adding new objects with the current timestamp
-        for obj in current_frame_objects:
-            if obj not in detection_start_time:
-                detection_start_time[obj] = current_time
-
-        # Removing objects that leave the frame
-        for obj in list(detection_start_time.keys()):
-            if obj not in current_frame_objects:
-                detection_start_time.pop(obj)
 
         # Speak for new objects only after confirming.
         if current_state == STATE_SCAN:
-            for obj, start_time in detection_start_time.items():
-                if obj not in spoken_objects_global and (current_time - start_time) >= CONFIRMATION_TIME:
-                    # Find its bounding box in current detections
-                    for det in detections:
-                        classname = labels[int(det.cls.item())]
-                        if classname == obj:
-                            xyxy = det.xyxy.cpu().numpy().squeeze().astype(int)
-                            xmin, ymin, xmax, ymax = xyxy
-                            x_center = (xmin + xmax) / 2
-                            if x_center < left_zone:
-                                position = "left"
-                            elif x_center > right_zone:
-                                position = "right"
-                            else:
-                                position = "center"
-                            break
+            for track_id, x_center in zip(detections['track_id'].tolist(), detections['cx'].tolist()):
+                track = tracker.get(track_id)
+                if track_id not in spoken_objects_global and (current_time - track.first_seen) >= CONFIRMATION_TIME:
+                    if x_center < left_zone:
+                        position = "left"
+                    elif x_center > right_zone:
+                        position = "right"
+                    else:
+                        position = "center"
 
                     # Speak object + position
-                    speak(f"Detected {obj} on the {position}")
+                    speak(f"Detected {labels[track.class_id]} on the {position}")
 
-                    spoken_objects_global.add(obj)
+                    spoken_objects_global.add(track_id)
 
-        # Removeing the objects that leave the frame
-        spoken_objects_global = spoken_objects_global.intersection(current_frame_objects)
+        # Removeing the tracks that are gone
+        spoken_objects_global.intersection_update(tracker.tracks)
 
         if current_state == STATE_GUIDE:
             now = time.time()
-            for det in detections:
-                classname = labels[int(det.cls.item())]
-                conf = det.conf.item()
-                if conf < conf_thresh:
-                    continue
-                xyxy = det.xyxy.cpu().numpy().squeeze().astype(int)
-                xmin, ymin, xmax, ymax = xyxy
+            frame_height, frame_width = frame.shape[:2]
+            area_ratios = detections['area'] / (frame_width * frame_height)
+            for track_id, class_idx, area_ratio in zip(detections['track_id'].tolist(),
+                                                       detections['class_id'].tolist(),
+                                                       area_ratios.tolist()):
+                classname = labels[class_idx]
 
-                frame_height, frame_width = frame.shape[:2]
-                bbox_area = (xmax - xmin) * (ymax - ymin)
-                frame_area = frame_width * frame_height
-                area_ratio = bbox_area / frame_area
-
-                last_time = last_guidance_time.get(classname, 0)
+                last_time = last_guidance_time.get(track_id, 0)
 
                 if now - last_time > Frame_Guidance_Cooldown:
                     if area_ratio < 0.20:
@@ -378,7 +400,7 @@ def main():
                         speak(f"Move the {classname} slightly away.")
                     else:
                         speak(f"Hold steady on the {classname}.")
-                    last_guidance_time[classname] = now
+                    last_guidance_time[track_id] = now
 
         # Draw FPS and object count
         if source_type in ['video','usb']:
@@ -392,16 +414,24 @@ def main():
 
         if current_state == STATE_GUIDE and active_object_bbox is not None:
             xmin, ymin, xmax, ymax = active_object_bbox
-            text = do_ocr_on_object(frame, active_object_bbox)
+            if source_type in ['video','usb']:
+                text = ocr_service.latest(active_track_id)
+            else:
+                text = do_ocr_on_object(frame, active_object_bbox)
             if text:
                 cv2.putText(frame, text, (xmin, ymin - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
 
-        cv2.imshow("YOLO Detection", frame)
+        if not args.no_display:
+            cv2.imshow("YOLO Detection", frame)
+        if source_type in ['video','usb']:
+            latency_buffer.append(time.time() - captured_at)
 
         if record:
             recorder.write(frame)
 
-        key = cv2.waitKey(1 if source_type in ['video','usb'] else 0) & 0xFF
+        key = -1
+        if not args.no_display:
+            key = cv2.waitKey(1 if source_type in ['video','usb'] else 0) & 0xFF
         if key in [ord('q'), ord('Q')]:
             break
         elif key in [ord('p'), ord('P')]:
@@ -422,7 +452,7 @@ def main():
                 area_ratio = bbox_area / frame_area
 
                 if area_ratio > 0.5:
-                    text = do_ocr_on_object(frame, active_object_bbox)
+                    text = ocr_service.latest(active_track_id, DEFAULT_FRESH_AGE) or do_ocr_on_object(frame, active_object_bbox)
                     if text:
                         speak(f"Reading text: {text}")
                     else:
@@ -450,17 +480,12 @@ def main():
                 speak("Scan mode")
 
             elif cmd == CMD_SELECT:
-                if detections and len(detections) > 0:
+                if len(detections) > 0:
                     # Select largest object by area
-                    active_object_det = max(
-                        detections,
-                        key=lambda d: (
-                            (d.xyxy[0][2] - d.xyxy[0][0]) *
-                            (d.xyxy[0][3] - d.xyxy[0][1])
-                        )
-                    )
-                    active_object_bbox = active_object_det.xyxy.cpu().numpy().squeeze().astype(int)
-                    active_object = labels[int(active_object_det.cls.item())]
+                    largest = detections[detections['area'].argmax()]
+                    active_track_id = int(largest['track_id'])
+                    active_object_bbox = largest['bbox'].copy()
+                    active_object = labels[int(largest['class_id'])]
 
                     current_state = STATE_GUIDE
                     speak(f"{active_object} selected")
@@ -475,11 +500,8 @@ def main():
                 
                 if current_state == STATE_GUIDE and active_object_bbox is not None:
                     # Check if object is large enough (close enough to camera)
-                    current_bbox = None
-                    for det in detections:
-                        if labels[int(det.cls.item())] == active_object:
-                            current_bbox = det.xyxy.cpu().numpy().squeeze().astype(int)
-                            break
+                    track = tracker.visible(active_track_id)
+                    current_bbox = track.bbox if track is not None else None
 
                     if current_bbox is None:
                         speak("Object not visible")
@@ -492,6 +514,7 @@ def main():
                     area_ratio = bbox_area / frame_area
                     
                     print(f" Area ratio: {area_ratio:.3f}")
+                    cached_text = ocr_service.latest(active_track_id, DEFAULT_FRESH_AGE)
                     
                     if area_ratio < 0.20:
                         speak("Please bring the object closer to read")
@@ -501,44 +524,29 @@ def main():
                         speak("Move the object slightly away")
                         print(f" Object too close (area_ratio={area_ratio:.3f})")
 
+                    elif cached_text:
+                        # Background OCR already read this object
+                        print(f"Cached OCR result: '{cached_text}'")
+                        speak(f"Reading text: {cached_text}")
+
                     else:
                         speak("Reading... Hold steady")
-                        print(" Capturing multiple frames for better OCR...")
+                        print(" Reading the last frames of the object...")
                         
-                        # Captureing multiple frames for better OCR
+                        # Crops the loop already captured, OCR'd in parallel
+                        crops = [crop for track_id, crop in recent_crops if track_id == active_track_id]
+                        if not crops:
+                            # Just selected, or a still image: use the current box once
+                            crops = [frame[max(0, ymin):ymax, max(0, xmin):xmax]]
                         ocr_results = []
-                        for attempt in range(5):
-                            # Getting fresh frame
-                            if source_type in ['video','usb']:
-                                ret, fresh_frame = cap.read()
-                                if not ret:
-                                    break
-                                if resize:
-                                    fresh_frame = cv2.resize(fresh_frame, (resW, resH))
-                                
-                                # Running YOLO to the update bbox
-                                fresh_results = model(fresh_frame, verbose=False)
-                                fresh_detections = fresh_results[0].boxes
-                                
-                                # Finding the same object in new frame
-                                for det in fresh_detections:
-                                    if labels[int(det.cls.item())] == active_object:
-                                        fresh_bbox = det.xyxy.cpu().numpy().squeeze().astype(int)
-                                        text = do_ocr_on_object(fresh_frame, fresh_bbox)
-                                        if text and len(text) > 3:  # Only keep meaningful results
-                                            ocr_results.append(text)
-                                            print(f"[] Attempt {attempt+1}: '{text}' (len={len(text)})")
-                                        break
-                            else:
-                                # For static images, just trying once
-                                text = do_ocr_on_object(frame, active_object_bbox)
-                                if text:
-                                    ocr_results.append(text)
-                                break
+                        for attempt, (text, conf) in enumerate(read_pool.map(ocr_cropped_image_with_confidence, crops)):
+                            if text and len(text) > 3:  # Only keep meaningful results
+                                ocr_results.append((text, conf))
+                                print(f"[] Attempt {attempt+1}: '{text}' (conf={conf:.0f})")
                         
-                        # Choosing the longest result
+                        # Voting across frames, weighted by confidence
                         if ocr_results:
-                            best_text = max(ocr_results, key=len)
+                            best_text = fuse_texts(ocr_results)
                             print(f"Best OCR result: '{best_text}'")
                             
                             speak(f"Reading text: {best_text}")
@@ -557,12 +565,17 @@ def main():
            fps_buffer.pop(0)
 
     # Cleanup
+    ocr_service.stop()
+    read_pool.shutdown(wait=False)
     if source_type in ['video','usb']:
         cap.release()
     if record:
         recorder.release()
     cv2.destroyAllWindows()
     print(f"Average FPS: {np.mean(fps_buffer):.2f}")
+    if latency_buffer:
+        print(f"Average capture-to-display latency: {np.mean(latency_buffer) * 1000:.1f} ms "
+              f"(frames dropped by the grabber: {cap.dropped})")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,124 @@
+import threading
+
+import cv2
+import numpy as np
+
+ENGINE_AUTO = "auto"
+ENGINE_TESSEROCR = "tesserocr"
+ENGINE_PYTESSERACT = "pytesseract"
+DEFAULT_LANG = "eng"
+
+
+class OCREngine:
+    """Common interface of the Tesseract bindings. Images are grayscale or BGR arrays."""
+
+    name = None
+
+    def read(self, image, psm=6):
+        """Recognized text, stripped."""
+        raise NotImplementedError
+
+    def read_with_confidence(self, image, psm=6):
+        """Recognized text and the mean word confidence (0-100)."""
+        raise NotImplementedError
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Tesseract through its C++ API in this process. The language model is
+    loaded once per thread and the handle is reused for every call, instead
+    of starting a tesseract process (and reloading the model) per image.
+    """
+
+    name = ENGINE_TESSEROCR
+
+    def __init__(self, lang=DEFAULT_LANG):
+        import tesserocr
+        self.tesserocr = tesserocr
+        self.lang = lang
+        # a TessBaseAPI handle must not be shared between threads
+        self._local = threading.local()
+
+    def _api(self, image, psm):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = self.tesserocr.PyTessBaseAPI(lang=self.lang)
+            self._local.api = api
+        api.SetPageSegMode(psm)  # PSM enum values are the --psm numbers
+
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        image = np.ascontiguousarray(image)
+        h, w = image.shape[:2]
+        channels = 1 if image.ndim == 2 else image.shape[2]
+        api.SetImageBytes(image.tobytes(), w, h, channels, w * channels)
+        return api
+
+    def read(self, image, psm=6):
+        return self._api(image, psm).GetUTF8Text().strip()
+
+    def read_with_confidence(self, image, psm=6):
+        api = self._api(image, psm)
+        text = api.GetUTF8Text().strip()
+        confs = api.AllWordConfidences()
+        return text, (sum(confs) / len(confs) if confs else 0.0)
+
+
+class PytesseractEngine(OCREngine):
+    """Fallback: one tesseract subprocess per call."""
+
+    name = ENGINE_PYTESSERACT
+
+    def __init__(self, lang=DEFAULT_LANG):
+        import pytesseract
+        self.pytesseract = pytesseract
+        self.lang = lang
+
+    def read(self, image, psm=6):
+        return self.pytesseract.image_to_string(image, lang=self.lang, config=f"--psm {psm}").strip()
+
+    def read_with_confidence(self, image, psm=6):
+        data = self.pytesseract.image_to_data(
+            image, lang=self.lang, config=f"--psm {psm}",
+            output_type=self.pytesseract.Output.DICT
+        )
+
+        lines = {}
+        confs = []
+        for word, conf, block, par, line in zip(data["text"], data["conf"], data["block_num"],
+                                                data["par_num"], data["line_num"]):
+            conf = float(conf)
+            if conf < 0 or not word.strip():
+                continue
+            lines.setdefault((block, par, line), []).append(word)
+            confs.append(conf)
+
+        text = "\n".join(" ".join(words) for words in lines.values())
+        return text, (sum(confs) / len(confs) if confs else 0.0)
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def load_engine(engine=ENGINE_AUTO, lang=DEFAULT_LANG):
+    if engine == ENGINE_TESSEROCR:
+        return TesserocrEngine(lang)
+    if engine == ENGINE_PYTESSERACT:
+        return PytesseractEngine(lang)
+    if engine != ENGINE_AUTO:
+        raise ValueError(f"Unknown OCR engine: {engine}")
+    try:
+        return TesserocrEngine(lang)
+    except ImportError:
+        return PytesseractEngine(lang)
+
+
+def get_engine(engine=ENGINE_AUTO, lang=DEFAULT_LANG) -> OCREngine:
+    """Shared engine for this process, created on first use."""
+    key = (engine, lang)
+    with _engines_lock:
+        if key not in _engines:
+            _engines[key] = load_engine(engine, lang)
+            print(f"OCR engine: {_engines[key].name}")
+        return _engines[key]
@@ -0,0 +1,89 @@
+from collections import defaultdict
+from difflib import SequenceMatcher
+
+
+def vote_word(candidates):
+    """
+    One word from weighted candidate spellings: the most supported length
+    wins, then every character position is voted on separately, so two
+    reads with different single-character errors still fuse correctly.
+    """
+    by_length = defaultdict(float)
+    for word, weight in candidates.items():
+        by_length[len(word)] += weight
+    length = max(by_length, key=by_length.get)
+
+    same_length = [(word, weight) for word, weight in candidates.items() if len(word) == length]
+    chars = []
+    for i in range(length):
+        tally = defaultdict(float)
+        for word, weight in same_length:
+            tally[word[i]] += weight
+        chars.append(max(tally, key=tally.get))
+    return "".join(chars)
+
+
+def word_key(words):
+    return [word.lower() for word in words]
+
+
+def fuse_texts(results):
+    """
+    Fuses OCR reads of the same text, given as (text, confidence 0-100)
+    pairs. The skeleton is the read that agrees best with all the reads,
+    weighted by their confidence, so one confident but truncated read
+    cannot outvote several reads that agree. Every other read is aligned
+    to it word by word: aligned words vote on spelling, and words a read
+    lacks or adds vote on whether the word is there at all.
+    """
+    reads = [(text.split(), max(float(conf), 1.0)) for text, conf in results if text and text.strip()]
+    if not reads:
+        return ""
+
+    keys = [word_key(words) for words, _ in reads]
+
+    def agreement(i):
+        return sum(
+            conf * (1.0 if i == j else SequenceMatcher(None, keys[i], keys[j], autojunk=False).ratio())
+            for j, (_, conf) in enumerate(reads)
+        )
+
+    skeleton = max(range(len(reads)), key=lambda i: (agreement(i), reads[i][1], len(reads[i][0])))
+    anchor, anchor_conf = reads[skeleton]
+    slots = [defaultdict(float, {word: anchor_conf}) for word in anchor]
+    absent = [0.0] * len(anchor)
+    # words other reads have between skeleton words: gap -> lowercased words -> [weight, spelling slots]
+    inserts = [{} for _ in range(len(anchor) + 1)]
+    total = sum(conf for _, conf in reads)
+
+    for n, (words, conf) in enumerate(reads):
+        if n == skeleton:
+            continue
+        matcher = SequenceMatcher(None, keys[skeleton], keys[n], autojunk=False)
+        for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+            # equal spans and one-to-one substitutions line up word for word
+            if tag == "equal" or (tag == "replace" and i2 - i1 == j2 - j1):
+                for k in range(i2 - i1):
+                    slots[i1 + k][words[j1 + k]] += conf
+                continue
+            # otherwise the skeleton words are missing from this read ...
+            for i in range(i1, i2):
+                absent[i] += conf
+            # ... and its own words are extra ones at that point
+            if j2 > j1:
+                key = tuple(keys[n][j1:j2])
+                entry = inserts[i1].setdefault(key, [0.0, [defaultdict(float) for _ in key]])
+                entry[0] += conf
+                for slot, word in zip(entry[1], words[j1:j2]):
+                    slot[word] += conf
+
+    fused = []
+    for i in range(len(anchor) + 1):
+        if inserts[i]:
+            weight, spellings = max(inserts[i].values(), key=lambda e: e[0])
+            # added only when more weight reads them than reads without them
+            if weight > total - weight:
+                fused.extend(vote_word(slot) for slot in spellings)
+        if i < len(anchor) and sum(slots[i].values()) >= absent[i]:
+            fused.append(vote_word(slots[i]))
+    return " ".join(fused)
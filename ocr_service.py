@@ -0,0 +1,121 @@
+import time
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from pipeline import LatestSlot
+
+DEFAULT_INTERVAL = 0.5  # seconds between crops taken for OCR
+DEFAULT_CACHE_SIZE = 64
+DEFAULT_HASH_DISTANCE = 6  # dHash bits two crops may differ by and still count as the same image
+DEFAULT_FRESH_AGE = 2.0  # seconds a result stays usable for READ
+
+
+def dhash(image, size=8):
+    """64-bit difference hash; near-identical crops differ in only a few bits."""
+    if image.ndim == 3:
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(image, (size + 1, size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).ravel()
+    return int(np.packbits(bits).view(">u8")[0])
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class OCRService(threading.Thread):
+    """
+    Reads the selected object's text in the background. The frame loop
+    hands over the active crop with submit(), which keeps at most one crop
+    per `interval`; the worker skips crops whose perceptual hash is close to
+    a cached one and OCRs the rest with `read_fn(crop)`. latest() serves
+    the newest text of a track for the overlay and READ without waiting.
+    """
+
+    def __init__(self, read_fn, interval=DEFAULT_INTERVAL, cache_size=DEFAULT_CACHE_SIZE,
+                 hash_distance=DEFAULT_HASH_DISTANCE):
+        super().__init__(daemon=True)
+        self.read_fn = read_fn
+        self.interval = interval
+        self.cache_size = cache_size
+        self.hash_distance = hash_distance
+        self.hits = 0
+        self.misses = 0
+
+        self._inbox = LatestSlot()
+        self._lock = threading.Lock()
+        self._cache = OrderedDict()  # dHash -> text, least recently used first
+        self._latest = {}  # track ID -> (text, time)
+        self._last_submit = 0.0
+        self._running = True
+
+    def submit(self, track_id, frame, bbox):
+        now = time.time()
+        if track_id is None or now - self._last_submit < self.interval:
+            return False
+
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = (int(v) for v in bbox)
+        x1, y1, x2, y2 = max(0, x1), max(0, y1), min(w, x2), min(h, y2)
+        if x2 - x1 < 20 or y2 - y1 < 20:
+            return False
+
+        self._last_submit = now
+        self._inbox.put((track_id, frame[y1:y2, x1:x2].copy(), now))
+        return True
+
+    def latest(self, track_id, max_age=None):
+        """The newest text for a track, or None if there is none or it is older than max_age."""
+        with self._lock:
+            entry = self._latest.get(track_id)
+        if entry is None:
+            return None
+        text, at = entry
+        if max_age is not None and time.time() - at > max_age:
+            return None
+        return text
+
+    def forget(self, track_id):
+        with self._lock:
+            self._latest.pop(track_id, None)
+
+    def stop(self):
+        self._running = False
+        self._inbox.close()
+
+    def run(self):
+        while self._running:
+            item, _ = self._inbox.get(timeout=0.5)
+            if item is None:
+                continue
+            track_id, crop, at = item
+
+            key = dhash(crop)
+            text = self._lookup(key)
+            if text is None:
+                self.misses += 1
+                try:
+                    text = self.read_fn(crop)
+                except Exception as e:
+                    print(f"OCR error: {e}")
+                    continue
+                with self._lock:
+                    self._cache[key] = text
+                    if len(self._cache) > self.cache_size:
+                        self._cache.popitem(last=False)
+            else:
+                self.hits += 1
+
+            with self._lock:
+                self._latest[track_id] = (text, at)
+
+    def _lookup(self, key):
+        with self._lock:
+            for cached_key in reversed(self._cache):
+                if hamming(key, cached_key) <= self.hash_distance:
+                    self._cache.move_to_end(cached_key)
+                    return self._cache[cached_key]
+        return None
@@ -0,0 +1,129 @@
+import time
+import threading
+from collections import deque
+
+
+class LatestSlot:
+    """
+    Single-item hand-off between two threads where the newest item wins.
+    put() never blocks: an item that was not consumed yet is replaced and
+    counted as dropped, so a slow consumer never adds latency upstream.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._put_time = 0.0
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.dropped += 1
+            self._item = item
+            self._put_time = time.perf_counter()
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """
+        Takes the newest item, waiting up to `timeout` seconds for one.
+        Returns (item, seconds the item sat in the slot) or (None, 0.0).
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._item is not None or self._closed, timeout)
+            if self._item is None:
+                return None, 0.0
+            item = self._item
+            self._item = None
+            return item, time.perf_counter() - self._put_time
+
+    def peek(self):
+        # newest item without consuming it
+        with self._cond:
+            return self._item
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class StageStats:
+    """Rolling throughput, queue-wait and busy-time figures for one stage."""
+
+    def __init__(self, name, window=120):
+        self.name = name
+        self.processed = 0
+        self._lock = threading.Lock()
+        self._done_at = deque(maxlen=window)
+        self._waits = deque(maxlen=window)
+        self._busy = deque(maxlen=window)
+
+    def record(self, wait, busy):
+        with self._lock:
+            self.processed += 1
+            self._done_at.append(time.perf_counter())
+            self._waits.append(wait)
+            self._busy.append(busy)
+
+    def snapshot(self):
+        with self._lock:
+            fps = 0.0
+            if len(self._done_at) > 1:
+                span = self._done_at[-1] - self._done_at[0]
+                if span > 0:
+                    fps = (len(self._done_at) - 1) / span
+            avg_wait = sum(self._waits) / len(self._waits) if self._waits else 0.0
+            avg_busy = sum(self._busy) / len(self._busy) if self._busy else 0.0
+            return {
+                "stage": self.name,
+                "processed": self.processed,
+                "fps": round(fps, 2),
+                "queue_wait_ms": round(avg_wait * 1000, 2),
+                "busy_ms": round(avg_busy * 1000, 2),
+            }
+
+
+class PipelineStage(threading.Thread):
+    """
+    Runs `work(item)` for every item taken from `inbox` and puts the result
+    into `outbox`. A stage without an inbox is a source and calls `work()`.
+    `work` may return None to skip publishing (e.g. a failed camera read).
+    """
+
+    def __init__(self, name, work, is_running, inbox=None, outbox=None, poll_interval=0.1):
+        super().__init__(name=name, daemon=True)
+        self.work = work
+        self.is_running = is_running
+        self.inbox = inbox
+        self.outbox = outbox
+        self.poll_interval = poll_interval
+        self.stats = StageStats(name)
+
+    def run(self):
+        while self.is_running():
+            wait = 0.0
+            if self.inbox is not None:
+                item, wait = self.inbox.get(timeout=self.poll_interval)
+                if item is None:
+                    continue
+
+            t_start = time.perf_counter()
+            try:
+                result = self.work(item) if self.inbox is not None else self.work()
+            except Exception as e:
+                print(f"{self.name} stage error: {e}")
+                continue
+            busy = time.perf_counter() - t_start
+
+            if result is None:
+                continue
+            self.stats.record(wait, busy)
+            if self.outbox is not None:
+                self.outbox.put(result)
+
+    def snapshot(self):
+        stats = self.stats.snapshot()
+        stats["dropped"] = self.inbox.dropped if self.inbox is not None else 0
+        return stats
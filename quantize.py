@@ -0,0 +1,297 @@
+import os
+import re
+import glob
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+from inference import Detections, OnnxDetector, box_iou, load_detector
+
+IMG_EXTS = ['.jpg', '.jpeg', '.png', '.bmp']
+DEFAULT_CALIBRATION_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "my_model_v2", "content", "project_v2", "runs", "predict_v2"
+)
+HOLDOUT_EVERY = 4  # every 4th image is kept out of calibration for evaluation
+
+
+def list_images(folder):
+    return sorted(f for f in glob.glob(f"{folder}/*") if os.path.splitext(f)[1].lower() in IMG_EXTS)
+
+
+def split_images(images, holdout_every=HOLDOUT_EVERY):
+    """
+    (calibration, evaluation) lists: every `holdout_every`-th image is held
+    out, so both sets span the whole folder. 0 uses every image for both.
+    """
+    if not holdout_every:
+        return images, images
+    calibration = [p for i, p in enumerate(images) if i % holdout_every != holdout_every - 1]
+    evaluation = [p for i, p in enumerate(images) if i % holdout_every == holdout_every - 1]
+    return calibration, evaluation
+
+
+class ImageCalibrationReader:
+    """Feeds letterboxed calibration images to the ONNX Runtime calibrator."""
+
+    def __init__(self, detector, image_paths):
+        self.detector = detector
+        self.image_paths = iter(image_paths)
+
+    def get_next(self):
+        for path in self.image_paths:
+            frame = cv2.imread(path)
+            if frame is None:
+                continue
+            blob, _, _ = self.detector.preprocess(frame)
+            return {self.detector.input_name: blob}
+        return None
+
+    def rewind(self):
+        pass
+
+
+def head_nodes(onnx_path):
+    """
+    Nodes of the YOLO Detect head except its convolutions. Quantizing the
+    box decoding (DFL, sigmoid, concat) costs far more accuracy than it
+    saves time, so it stays in float.
+    """
+    import onnx
+    graph = onnx.load(onnx_path).graph
+    index = re.compile(r"^/model\.(\d+)/")
+    layers = [int(m.group(1)) for m in (index.match(n.name) for n in graph.node) if m]
+    if not layers:
+        return []
+    prefix = f"/model.{max(layers)}/"
+    return [n.name for n in graph.node if n.name.startswith(prefix) and n.op_type != "Conv"]
+
+
+def build_int8(fp32_path, int8_path, calibration_dir=DEFAULT_CALIBRATION_DIR, limit=0, per_channel=True,
+               holdout_every=HOLDOUT_EVERY):
+    """
+    Static INT8 (QDQ) quantization of an exported FP32 ONNX model. The
+    images compare() evaluates on (see split_images) are not calibrated on.
+    """
+    from onnxruntime.quantization import (
+        CalibrationMethod, QuantFormat, QuantType, quantize_static
+    )
+    from onnxruntime.quantization.shape_inference import quant_pre_process
+
+    images, _ = split_images(list_images(calibration_dir), holdout_every)
+    if limit:
+        images = images[:limit]
+    if not images:
+        raise FileNotFoundError(f"No calibration images in {calibration_dir}")
+
+    detector = OnnxDetector(fp32_path)
+    prepared_path = os.path.splitext(int8_path)[0] + "_prep.onnx"
+    quant_pre_process(fp32_path, prepared_path)
+
+    print(f"Calibrating on {len(images)} images from {calibration_dir}")
+    try:
+        quantize_static(
+            prepared_path,
+            int8_path,
+            ImageCalibrationReader(detector, images),
+            quant_format=QuantFormat.QDQ,
+            activation_type=QuantType.QUInt8,
+            weight_type=QuantType.QInt8,
+            per_channel=per_channel,
+            calibrate_method=CalibrationMethod.MinMax,
+            nodes_to_exclude=head_nodes(prepared_path),
+        )
+    finally:
+        os.remove(prepared_path)
+
+    # keep class names etc. so the INT8 model loads like the FP32 one
+    import onnx
+    source = onnx.load(fp32_path)
+    quantized = onnx.load(int8_path)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(source.metadata_props)
+    onnx.save(quantized, int8_path)
+    return int8_path
+
+
+def average_precision(recall, precision):
+    # 101-point interpolated AP, as used by COCO and ultralytics
+    mrec = np.concatenate(([0.0], recall, [1.0]))
+    mpre = np.concatenate(([1.0], precision, [0.0]))
+    mpre = np.flip(np.maximum.accumulate(np.flip(mpre)))
+    x = np.linspace(0, 1, 101)
+    y = np.interp(x, mrec, mpre)
+    return float(np.sum((x[1:] - x[:-1]) * (y[1:] + y[:-1]) / 2))
+
+
+def evaluate(predictions, ground_truth, conf_thresh, iou_thresh=0.5):
+    """
+    predictions / ground_truth: one Detections per image (ground truth conf
+    is ignored). Returns mAP@iou over all predictions and recall at
+    `conf_thresh`, the operating point the app uses.
+    """
+    classes = set()
+    for gt in ground_truth:
+        classes.update(gt.cls.tolist())
+
+    aps, hits, total_gt = [], 0, 0
+    for c in sorted(classes):
+        scores, tp, n_gt = [], [], 0
+        for pred, gt in zip(predictions, ground_truth):
+            gt_boxes = gt.xyxy[gt.cls == c]
+            n_gt += len(gt_boxes)
+            p_mask = pred.cls == c
+            p_boxes, p_conf = pred.xyxy[p_mask], pred.conf[p_mask]
+            order = p_conf.argsort()[::-1]
+            p_boxes, p_conf = p_boxes[order], p_conf[order]
+
+            matched = np.zeros(len(gt_boxes), dtype=bool)
+            ious = box_iou(p_boxes, gt_boxes) if len(gt_boxes) and len(p_boxes) else None
+            for i in range(len(p_boxes)):
+                hit = False
+                if ious is not None:
+                    candidates = np.where(~matched & (ious[i] >= iou_thresh))[0]
+                    if len(candidates):
+                        matched[candidates[ious[i, candidates].argmax()]] = True
+                        hit = True
+                scores.append(p_conf[i])
+                tp.append(hit)
+
+        total_gt += n_gt
+        if n_gt == 0:
+            continue
+        scores, tp = np.array(scores), np.array(tp, dtype=bool)
+        order = scores.argsort()[::-1]
+        scores, tp = scores[order], tp[order]
+        tp_cum = np.cumsum(tp)
+        recall = tp_cum / n_gt
+        precision = tp_cum / np.arange(1, len(tp) + 1)
+        aps.append(average_precision(recall, precision) if len(tp) else 0.0)
+        hits += int(tp[scores >= conf_thresh].sum())
+
+    return {
+        "map50": float(np.mean(aps)) if aps else 0.0,
+        "recall": hits / total_gt if total_gt else 0.0,
+    }
+
+
+def load_yolo_labels(label_dir, image_path, shape):
+    name = os.path.splitext(os.path.basename(image_path))[0] + ".txt"
+    path = os.path.join(label_dir, name)
+    if not os.path.exists(path):
+        return Detections(np.empty((0, 4)), [], [])
+    rows = np.loadtxt(path, ndmin=2)
+    h, w = shape[:2]
+    cx, cy, bw, bh = rows[:, 1] * w, rows[:, 2] * h, rows[:, 3] * w, rows[:, 4] * h
+    xyxy = np.stack((cx - bw / 2, cy - bh / 2, cx + bw / 2, cy + bh / 2), axis=1)
+    return Detections(xyxy, np.ones(len(rows)), rows[:, 0])
+
+
+def run_detector(detector, frames, warmup=3):
+    for frame in frames[:warmup]:
+        detector.detect(frame)
+    results, t_start = [], time.perf_counter()
+    for frame in frames:
+        results.append(detector.detect(frame))
+    return results, (time.perf_counter() - t_start) / len(frames)
+
+
+def compare(fp32_path, int8_path, image_dir=DEFAULT_CALIBRATION_DIR, label_dir=None, conf_thresh=0.5,
+            holdout_every=HOLDOUT_EVERY):
+    """
+    Reports INT8 speedup and accuracy drift against the FP32 model on the
+    images build_int8() held out of calibration (all of `image_dir` when
+    holdout_every is 0, e.g. for a separate evaluation folder). Without
+    labels the FP32 detections at `conf_thresh` serve as ground truth, so the
+    figures measure agreement; with YOLO-format labels both models are also
+    scored against the real annotations.
+    """
+    _, images = split_images(list_images(image_dir), holdout_every)
+    loaded = [(p, cv2.imread(p)) for p in images]
+    loaded = [(p, f) for p, f in loaded if f is not None]
+    paths = [p for p, _ in loaded]
+    frames = [f for _, f in loaded]
+    if not frames:
+        raise FileNotFoundError(f"No images in {image_dir}")
+
+    fp32 = load_detector(fp32_path)
+    int8 = load_detector(int8_path)
+    # low threshold so the precision/recall curve is complete
+    for detector in (fp32, int8):
+        detector.conf = 0.001
+
+    fp32_results, fp32_time = run_detector(fp32, frames)
+    int8_results, int8_time = run_detector(int8, frames)
+
+    reference = [
+        Detections(r.xyxy[keep], r.conf[keep], r.cls[keep])
+        for r, keep in ((r, r.conf >= conf_thresh) for r in fp32_results)
+    ]
+    report = {
+        "images": len(frames),
+        "fp32_ms": fp32_time * 1000,
+        "int8_ms": int8_time * 1000,
+        "speedup": fp32_time / int8_time if int8_time else 0.0,
+        "agreement": evaluate(int8_results, reference, conf_thresh),
+    }
+
+    if label_dir:
+        labels = [load_yolo_labels(label_dir, p, f.shape) for p, f in zip(paths, frames)]
+        report["fp32"] = evaluate(fp32_results, labels, conf_thresh)
+        report["int8"] = evaluate(int8_results, labels, conf_thresh)
+        report["map50_drift"] = report["int8"]["map50"] - report["fp32"]["map50"]
+        report["recall_drift"] = report["int8"]["recall"] - report["fp32"]["recall"]
+    return report
+
+
+def print_report(report):
+    print(f"Images: {report['images']}")
+    print(f"FP32: {report['fp32_ms']:.1f} ms/img | INT8: {report['int8_ms']:.1f} ms/img | speedup {report['speedup']:.2f}x")
+    agreement = report["agreement"]
+    print(f"INT8 vs FP32 detections: mAP50 {agreement['map50']:.3f} | recall {agreement['recall']:.3f}")
+    if "fp32" in report:
+        print(f"FP32 vs labels: mAP50 {report['fp32']['map50']:.3f} | recall {report['fp32']['recall']:.3f}")
+        print(f"INT8 vs labels: mAP50 {report['int8']['map50']:.3f} | recall {report['int8']['recall']:.3f}")
+        print(f"Drift: mAP50 {report['map50_drift']:+.3f} | recall {report['recall_drift']:+.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and check an INT8 version of the detector")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Quantize an FP32 ONNX export to INT8")
+    build.add_argument('--model', required=True, help='FP32 ONNX model (export with inference.py)')
+    build.add_argument('--output', default=None, help='INT8 model path (default: <model>_int8.onnx)')
+    build.add_argument('--calibration', default=DEFAULT_CALIBRATION_DIR, help='Folder of calibration images')
+    build.add_argument('--limit', type=int, default=0, help='Use at most this many calibration images')
+    build.add_argument('--per-tensor', action='store_true', help='Per-tensor instead of per-channel weights')
+    build.add_argument('--holdout', type=int, default=HOLDOUT_EVERY,
+                       help='Hold every Nth image out of calibration for --compare (0: none)')
+    build.add_argument('--compare', action='store_true', help='Run the comparison after building')
+
+    check = sub.add_parser("compare", help="Report INT8 speedup and accuracy drift")
+    check.add_argument('--fp32', required=True, help='FP32 model')
+    check.add_argument('--int8', required=True, help='INT8 model')
+    check.add_argument('--images', default=DEFAULT_CALIBRATION_DIR, help='Folder of evaluation images')
+    check.add_argument('--labels', default=None, help='Optional YOLO-format label folder for true mAP')
+    check.add_argument('--thresh', type=float, default=0.5, help='Confidence threshold the app runs at')
+    check.add_argument('--holdout', type=int, default=HOLDOUT_EVERY,
+                       help='Evaluate on every Nth image, the ones build held out (0: all images)')
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        output = args.output or os.path.splitext(args.model)[0] + "_int8.onnx"
+        build_int8(args.model, output, args.calibration, args.limit, per_channel=not args.per_tensor,
+                   holdout_every=args.holdout)
+        print(f"INT8 model written to {output}")
+        if args.compare:
+            print_report(compare(args.model, output, args.calibration, holdout_every=args.holdout))
+    else:
+        print_report(compare(args.fp32, args.int8, args.images, args.labels, args.thresh, args.holdout))
+
+
+if __name__ == "__main__":
+    main()
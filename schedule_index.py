@@ -0,0 +1,68 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def minute_of_day(time_str):
+    """Minutes since midnight of an "HH:MM" string."""
+    t = datetime.strptime(time_str, "%H:%M")
+    return t.hour * 60 + t.minute
+
+
+class ScheduleIndex:
+    """
+    All intake times sorted by minute of day, parsed once. due() finds the
+    schedules around a time with two binary searches, and a window that
+    crosses midnight (23:30 for a 00:10 dose) is split into its two ranges
+    of the day. Built from get_medicines_with_schedules() pairs.
+    """
+
+    def __init__(self, medicines_with_schedules=()):
+        entries = []
+        for medicine, schedules in medicines_with_schedules:
+            for schedule in schedules:
+                try:
+                    minute = minute_of_day(schedule[2])
+                except (TypeError, ValueError):
+                    print(f"Skipping schedule {schedule[0]} with invalid time: {schedule[2]!r}")
+                    continue
+                entries.append((minute, schedule[0], medicine, schedule))
+        entries.sort(key=lambda e: (e[0], e[1]))
+        self._minutes = [e[0] for e in entries]
+        self._entries = [(e[2], e[3]) for e in entries]
+
+    def __len__(self):
+        return len(self._minutes)
+
+    def due(self, now=None, window_minutes=60, medicine_id=None):
+        """
+        Schedules within window_minutes of `now` (a datetime, default the
+        current time) as (medicine, schedule, minutes away), in time order
+        from the start of the window.
+        """
+        now = now or datetime.now()
+        at = now.hour * 60 + now.minute + now.second / 60
+        lo, hi = at - window_minutes, at + window_minutes
+
+        if hi - lo >= MINUTES_PER_DAY:
+            ranges = [(0, len(self._minutes))]
+        elif lo < 0:
+            ranges = [self._range(lo + MINUTES_PER_DAY, MINUTES_PER_DAY), self._range(0, hi)]
+        elif hi >= MINUTES_PER_DAY:
+            ranges = [self._range(lo, MINUTES_PER_DAY), self._range(0, hi - MINUTES_PER_DAY)]
+        else:
+            ranges = [self._range(lo, hi)]
+
+        due = []
+        for start, end in ranges:
+            for i in range(start, end):
+                medicine, schedule = self._entries[i]
+                if medicine_id is not None and medicine[0] != medicine_id:
+                    continue
+                off = abs(self._minutes[i] - at)
+                due.append((medicine, schedule, min(off, MINUTES_PER_DAY - off)))
+        return due
+
+    def _range(self, lo, hi):
+        return bisect_left(self._minutes, lo), bisect_right(self._minutes, hi)
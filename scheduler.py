@@ -0,0 +1,172 @@
+import time
+
+import cv2
+import numpy as np
+
+from inference import Detections, Detector
+
+DEFAULT_TARGET_FPS = 15.0
+DEFAULT_MAX_INTERVAL = 8
+DEFAULT_SCENE_CHANGE = 0.06  # mean absolute difference (0-1) that forces a fresh detection
+
+THUMB_SIZE = (64, 48)
+GRID = np.linspace(0.2, 0.8, 4, dtype=np.float32)  # sample points kept away from the box edges
+MIN_TRACKED_POINTS = 4
+EMA_ALPHA = 0.2
+LK_PARAMS = dict(
+    winSize=(15, 15),
+    maxLevel=2,
+    criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03),
+)
+
+
+def ema(previous, value):
+    return value if previous is None else previous + EMA_ALPHA * (value - previous)
+
+
+def box_points(xyxy):
+    """A 4x4 grid of points inside every box, shaped for calcOpticalFlowPyrLK, and the owning box index."""
+    gx, gy = np.meshgrid(GRID, GRID)
+    gx, gy = gx.ravel(), gy.ravel()
+    w = (xyxy[:, 2] - xyxy[:, 0])[:, None]
+    h = (xyxy[:, 3] - xyxy[:, 1])[:, None]
+    xs = xyxy[:, 0, None] + w * gx
+    ys = xyxy[:, 1, None] + h * gy
+    points = np.stack((xs, ys), axis=2).reshape(-1, 1, 2).astype(np.float32)
+    owner = np.repeat(np.arange(len(xyxy)), len(gx))
+    return points, owner
+
+
+class AdaptiveDetector(Detector):
+    """
+    Runs the wrapped detector only on key frames and moves the last boxes
+    along with sparse optical flow in between. A key frame is taken every
+    `interval` frames, when the scene changes by more than `scene_change`,
+    or when the tracker loses most boxes. `interval` is recomputed after
+    every frame from the measured detector, tracker and rest-of-loop times
+    so the loop runs at `target_fps`, capped at `max_interval`.
+    """
+
+    def __init__(self, detector, target_fps=DEFAULT_TARGET_FPS,
+                 max_interval=DEFAULT_MAX_INTERVAL, scene_change=DEFAULT_SCENE_CHANGE):
+        super().__init__(detector.model_path)
+        self.detector = detector
+        self.names = detector.names
+        self.backend = detector.backend
+        self.frame_budget = 1.0 / target_fps if target_fps > 0 else 0.0
+        self.max_interval = max(1, max_interval)
+        self.scene_change = scene_change
+
+        self.interval = 1
+        self.since_detect = 0
+        self.frames = 0
+        self.detections_run = 0
+
+        self._last = None
+        self._prev_gray = None
+        self._key_thumb = None
+        self._force = True
+        self._detect_time = None
+        self._track_time = None
+        self._overhead = None
+        self._call_end = None
+
+    def reset(self):
+        """Forces a detection on the next frame, e.g. after a source switch."""
+        self._force = True
+
+    def detect(self, frame):
+        start = time.perf_counter()
+        if self._call_end is not None:
+            self._overhead = ema(self._overhead, start - self._call_end)
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        thumb = cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+
+        if self._needs_detection(gray, thumb):
+            detections = self.detector.detect(frame)
+            self._detect_time = ema(self._detect_time, time.perf_counter() - start)
+            self._key_thumb = thumb
+            self._force = False
+            self.since_detect = 0
+            self.detections_run += 1
+        else:
+            detections = self._propagate(gray)
+            self._track_time = ema(self._track_time, time.perf_counter() - start)
+            self.since_detect += 1
+
+        self._last = detections
+        self._prev_gray = gray
+        self.frames += 1
+        self._update_interval()
+        self._call_end = time.perf_counter()
+        return detections
+
+    def _needs_detection(self, gray, thumb):
+        if self._force or self._last is None or self._prev_gray is None:
+            return True
+        if self._prev_gray.shape != gray.shape:
+            return True
+        if self.since_detect + 1 >= self.interval:
+            return True
+        change = float(np.mean(cv2.absdiff(thumb, self._key_thumb))) / 255.0
+        return change > self.scene_change
+
+    def _propagate(self, gray):
+        last = self._last
+        if not len(last):
+            return last
+
+        points, owner = box_points(last.xyxy)
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(self._prev_gray, gray, points, None, **LK_PARAMS)
+        points, moved = points.reshape(-1, 2), moved.reshape(-1, 2)
+        ok = status.reshape(-1) == 1
+
+        xyxy = last.xyxy.copy()
+        lost = 0
+        for i in range(len(xyxy)):
+            sel = ok & (owner == i)
+            if sel.sum() < MIN_TRACKED_POINTS:
+                lost += 1
+                continue
+            old, new = points[sel], moved[sel]
+            old_center, new_center = np.median(old, axis=0), np.median(new, axis=0)
+            # scale from the spread of the points, so approaching objects grow
+            old_spread = np.median(np.linalg.norm(old - old_center, axis=1))
+            new_spread = np.median(np.linalg.norm(new - new_center, axis=1))
+            scale = new_spread / old_spread if old_spread > 1e-3 else 1.0
+
+            box_center = (xyxy[i, :2] + xyxy[i, 2:]) / 2 + (new_center - old_center)
+            half = (xyxy[i, 2:] - xyxy[i, :2]) / 2 * scale
+            xyxy[i] = np.concatenate((box_center - half, box_center + half))
+
+        h, w = gray.shape
+        np.clip(xyxy[:, 0::2], 0, w, out=xyxy[:, 0::2])
+        np.clip(xyxy[:, 1::2], 0, h, out=xyxy[:, 1::2])
+        if lost * 2 > len(xyxy):
+            self._force = True
+        return Detections(xyxy, last.conf, last.cls)
+
+    def _update_interval(self):
+        if not self.frame_budget or self._detect_time is None:
+            self.interval = 1
+            return
+        track = self._track_time or 0.0
+        spare = self.frame_budget - (self._overhead or 0.0) - track
+        if self._detect_time <= self.frame_budget - (self._overhead or 0.0):
+            self.interval = 1
+        elif spare <= 0:
+            self.interval = self.max_interval
+        else:
+            # average cost (detect + (N-1) * track) / N must fit in the budget
+            needed = int(np.ceil((self._detect_time - track) / spare))
+            self.interval = min(self.max_interval, max(1, needed))
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "frames": self.frames,
+            "detections": self.detections_run,
+            "detect_ms": (self._detect_time or 0.0) * 1000,
+            "track_ms": (self._track_time or 0.0) * 1000,
+        }
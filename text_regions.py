@@ -0,0 +1,135 @@
+import cv2
+import numpy as np
+
+LINE_PAD = 4
+MIN_CHAR_HEIGHT = 8
+DETECT_SIZE = 800  # longer side MSER runs at; its cost grows with the pixel count
+MIN_COVERAGE = 0.25  # share of the crop the found lines must cover before they replace it
+MIN_STRIP_CONF = 60.0  # strip reads below this mean confidence are checked against the full crop
+
+
+def find_text_lines(gray, max_lines=None):
+    """
+    Text line boxes (x1, y1, x2, y2) inside a grayscale crop, in reading
+    order. Character-like MSER regions are merged horizontally into lines,
+    so pictures and plain background on the pack are left out.
+    """
+    h, w = gray.shape[:2]
+    if h < MIN_CHAR_HEIGHT * 2 or w < MIN_CHAR_HEIGHT * 2:
+        return []
+
+    # large crops are searched at a reduced size and the boxes scaled back
+    scale = min(1.0, DETECT_SIZE / max(h, w))
+    small = gray if scale == 1.0 else cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    sh, sw = small.shape[:2]
+
+    # low min_diversity: the thick, blurred strokes of large print grow through
+    # a chain of near-identical regions that the default 0.2 prunes entirely
+    mser = cv2.MSER_create(5, max(20, sh * sw // 20000), sh * sw // 4, 0.25, 0.05)
+    _, boxes = mser.detectRegions(small)
+    if len(boxes) == 0:
+        return []
+
+    bw, bh = boxes[:, 2], boxes[:, 3]
+    # characters: not tiny, not most of the crop, not wide blobs
+    keep = (bh >= MIN_CHAR_HEIGHT) & (bh <= sh * 0.6) & (bw <= bh * 3) & (bw <= sw * 0.8)
+    boxes = boxes[keep]
+    if len(boxes) == 0:
+        return []
+
+    rows = merge_rows(boxes.tolist())
+    while True:
+        # a single left-to-right pass can leave pieces of one line apart
+        again = merge_rows([(x1, y1, x2 - x1, y2 - y1) for x1, y1, x2, y2 in rows])
+        if len(again) == len(rows):
+            break
+        rows = again
+
+    lines = []
+    for x1, y1, x2, y2 in rows:
+        # a line has at least two characters side by side
+        if x2 - x1 < (y2 - y1) * 1.5:
+            continue
+        lines.append((
+            max(0, int(x1 / scale) - LINE_PAD), max(0, int(y1 / scale) - LINE_PAD),
+            min(w, int(x2 / scale) + LINE_PAD), min(h, int(y2 / scale) + LINE_PAD),
+        ))
+
+    if max_lines is not None:
+        # largest lines first when there are too many
+        lines.sort(key=lambda b: (b[2] - b[0]) * (b[3] - b[1]), reverse=True)
+        lines = lines[:max_lines]
+    lines.sort(key=lambda b: (b[1], b[0]))
+    return lines
+
+
+def line_coverage(lines, shape):
+    """Fraction of an image of `shape` covered by the line boxes."""
+    mask = np.zeros(shape[:2], dtype=bool)
+    for x1, y1, x2, y2 in lines:
+        mask[y1:y2, x1:x2] = True
+    return float(mask.mean())
+
+
+def merge_rows(rects, max_gap=1.0, max_height_ratio=2.0):
+    """
+    Merges (x, y, w, h) character rects, left to right, into (x1, y1, x2, y2)
+    lines. A rect joins a line it shares a row with when their heights are
+    within max_height_ratio and the gap is at most max_gap times the taller
+    one, so headings and small print each form their own lines. Rects
+    inside a line (letter holes, punctuation) always join it.
+    """
+    merged = []
+    for x, y, rw, rh in sorted(rects):
+        for i, (x1, y1, x2, y2) in enumerate(merged):
+            lh = y2 - y1
+            overlap = min(y2, y + rh) - max(y1, y)
+            inside = x1 <= x and x + rw <= x2 and y1 <= y and y + rh <= y2
+            if inside or (overlap >= min(lh, rh) / 2 and max(lh, rh) <= min(lh, rh) * max_height_ratio
+                          and x - x2 <= max_gap * max(lh, rh)):
+                merged[i] = (x1, min(y1, y), max(x2, x + rw), max(y2, y + rh))
+                break
+        else:
+            merged.append((x, y, x + rw, y + rh))
+    return merged
+
+
+def text_strip(gray, max_lines=None, min_coverage=MIN_COVERAGE):
+    """
+    The text lines of a grayscale crop stacked into one image, so a single
+    OCR call reads all of them. Returns the crop unchanged when the lines
+    found cover less than `min_coverage` of it, since MSER then most likely
+    missed the small print of a dense label.
+    """
+    lines = find_text_lines(gray, max_lines)
+    if not lines or line_coverage(lines, gray.shape) < min_coverage:
+        return gray
+
+    width = max(x2 - x1 for x1, _, x2, _ in lines)
+    strips = []
+    for x1, y1, x2, y2 in lines:
+        line = gray[y1:y2, x1:x2]
+        # replicate the line's own background so no false edges are added
+        strips.append(cv2.copyMakeBorder(line, LINE_PAD, LINE_PAD, 0, width - (x2 - x1),
+                                         cv2.BORDER_REPLICATE))
+    return cv2.vconcat(strips)
+
+
+def read_text(gray, read, min_conf=MIN_STRIP_CONF):
+    """
+    OCR of a grayscale crop, text lines first and the whole crop when they
+    read poorly. `read(image)` returns (text, confidence 0-100). When the
+    strip reads empty or below min_conf the full crop is read as well, so
+    that case costs two reads, and the more confident text is kept. Off by
+    default in every OCR path (OCR_TEXT_LINES, --text-lines) until it is
+    shown to read real labels better than the whole crop.
+    """
+    strip = text_strip(gray)
+    text, conf = read(strip)
+    if strip is gray or (text and conf >= min_conf):
+        return text, conf
+
+    full_text, full_conf = read(gray)
+    if full_text and (not text or full_conf > conf):
+        return full_text, full_conf
+    return text, conf
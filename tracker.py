@@ -0,0 +1,100 @@
+import itertools
+import time
+from typing import Dict, Optional
+
+import numpy as np
+
+from inference import box_iou
+
+DEFAULT_IOU_THRESH = 0.3
+DEFAULT_MAX_AGE = 15  # frames a track survives without a matching detection
+
+
+class Track:
+    __slots__ = ("track_id", "class_id", "bbox", "conf", "first_seen", "last_seen", "hits", "misses")
+
+    def __init__(self, track_id, class_id, bbox, conf, now):
+        self.track_id = track_id
+        self.class_id = class_id
+        self.bbox = bbox
+        self.conf = conf
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.misses = 0
+
+    @property
+    def visible(self):
+        return self.misses == 0
+
+
+class IoUTracker:
+    """
+    SORT-style tracker: each frame's detections are matched to the live
+    tracks of the same class by IoU, best pairs first, so two bottles keep
+    two separate IDs. Unmatched detections start new tracks and a track is
+    dropped after `max_age` frames without a match. `tracks` indexes the
+    latest state by track ID.
+    """
+
+    def __init__(self, iou_thresh=DEFAULT_IOU_THRESH, max_age=DEFAULT_MAX_AGE):
+        self.iou_thresh = iou_thresh
+        self.max_age = max_age
+        self.tracks: Dict[int, Track] = {}
+        self._ids = itertools.count(1)
+
+    def reset(self):
+        self.tracks.clear()
+
+    def get(self, track_id) -> Optional[Track]:
+        return self.tracks.get(track_id)
+
+    def visible(self, track_id) -> Optional[Track]:
+        """The track if it was matched in the latest frame."""
+        track = self.tracks.get(track_id)
+        return track if track is not None and track.visible else None
+
+    def update(self, records, now=None):
+        """Fills records["track_id"] in place and returns the records."""
+        now = time.time() if now is None else now
+        tracks = list(self.tracks.values())
+        matched_tracks = set()
+        matched_dets = np.zeros(len(records), dtype=bool)
+
+        if tracks and len(records):
+            track_boxes = np.array([t.bbox for t in tracks], dtype=np.float32)
+            track_cls = np.array([t.class_id for t in tracks])
+            iou = box_iou(track_boxes, records["bbox"].astype(np.float32))
+            iou[track_cls[:, None] != records["class_id"][None, :]] = 0.0
+
+            rows, cols = np.nonzero(iou >= self.iou_thresh)
+            for k in np.argsort(-iou[rows, cols], kind="stable"):
+                t, d = rows[k], cols[k]
+                if t in matched_tracks or matched_dets[d]:
+                    continue
+                matched_tracks.add(t)
+                matched_dets[d] = True
+                self._refresh(tracks[t], records[d], now)
+                records["track_id"][d] = tracks[t].track_id
+
+        for t, track in enumerate(tracks):
+            if t not in matched_tracks:
+                track.misses += 1
+                if track.misses > self.max_age:
+                    del self.tracks[track.track_id]
+
+        for d in np.flatnonzero(~matched_dets):
+            rec = records[d]
+            track = Track(next(self._ids), int(rec["class_id"]), rec["bbox"].tolist(), float(rec["conf"]), now)
+            self.tracks[track.track_id] = track
+            records["track_id"][d] = track.track_id
+
+        return records
+
+    @staticmethod
+    def _refresh(track, rec, now):
+        track.bbox = rec["bbox"].tolist()
+        track.conf = float(rec["conf"])
+        track.last_seen = now
+        track.hits += 1
+        track.misses = 0